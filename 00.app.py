@@ -4,22 +4,60 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
-@st.cache_data
-def load_data():
-    data = pd.read_csv("1.merged_movies_sorted.csv")
-    return data
+from aggregates import aggregates_path, load_aggregates
+from reloading import DatasetWatcher
+from figures import FigureCache
+from paging import paged_table
+from query import FilterSpec
+
+@st.cache_resource
+def load_watcher():
+    # one row per movie (see dataset.py), queried by the engine picked with
+    # IMDB_ENGINE (see engines.py): the whole table in memory (pandas, default),
+    # straight from the memory-mapped movies.feather (arrow) or from the
+    # year/genre partitions in movies_partitions/ (partitioned).
+    # One per process, shared by every session - never modify its data in place.
+    # The watcher swaps in a new engine when movies.csv is rewritten or
+    # appended to (see reloading.py)
+    return DatasetWatcher("movies.csv")
 #1.merged_movies_sorted.csv
 
-df = load_data()
+@st.cache_data
+def load_sections(_engine, version):
+    # sections 1-4 and 6-9 precomputed by the pipeline (see aggregates.py);
+    # recomputed here if the artifact is missing or for another dataset version
+    return load_aggregates(_engine, aggregates_path("movies.csv"), version)
+
+@st.cache_resource
+def load_figures():
+    # rendered PNGs shared by every session; the plots below do not depend
+    # on the filters, so each one is drawn once per dataset version
+    return FigureCache()
+
+# the dataset as of this run; every section below uses this one version
+engine = load_watcher().current()
+version = engine.version
+figures = load_figures()
+genres = engine.genres
+sections = load_sections(engine, version)
 
 st.title("IMDB 2024 Data visualization")
 
+# ⚡ Approximate mode: distributions answered from sketches merged per (year, genre) cell (see sketches.py)
+approximate = st.toggle("Approximate mode", help="Answer the distributions from mergeable sketches instead of "
+                                                 "scanning every movie; error bounds are shown with each answer.")
+
 # 🔍 Advanced Interactive Filtering
 st.header("🎛️ Advanced Movie Filter")
 
-# Get all unique genres from exploded genres (comma-separated -> list)
-all_genres = df['genre'].dropna().str.split(',\s*').explode().unique()
-selected_genres = st.multiselect("Select Genre(s):", sorted(all_genres))
+selected_genres = st.multiselect("Select Genre(s):", sorted(genres))
+genre_match = st.radio("Match:", ["Any selected genre", "All selected genres"], horizontal=True)
+
+# Release Year Filtering (only when the data spans more than one year)
+first_year, last_year = map(int, engine.bounds('year'))
+release_years = (first_year, last_year)
+if first_year < last_year:
+    release_years = st.slider("Release Year", first_year, last_year, release_years)
 
 # Duration Filtering
 duration_option = st.selectbox("Select Duration Range (Hours):", ["All", "< 2 hrs", "2–3 hrs", "> 3 hrs"])
@@ -31,161 +69,189 @@ min_rating = st.slider("Minimum IMDb Rating", 0.0, 10.0, 0.0, step=0.1)
 min_votes = st.number_input("Minimum Number of Votes", min_value=0, value=0, step=1000)
 
 # 🧹 Apply Filters
-filtered_df = df.copy()
-
-# Duration Filtering
-if duration_option == "< 2 hrs":
-    filtered_df = filtered_df[filtered_df['runtime'] < 120]
-elif duration_option == "2–3 hrs":
-    filtered_df = filtered_df[(filtered_df['runtime'] >= 120) & (filtered_df['runtime'] <= 180)]
-elif duration_option == "> 3 hrs":
-    filtered_df = filtered_df[filtered_df['runtime'] > 180]
-
-# Rating & Votes Filtering
-filtered_df = filtered_df[(filtered_df['imdb_score'] >= min_rating) & (filtered_df['votes'] >= min_votes)]
-
-# Genre Filtering - Split multi-genre strings and match any
-if selected_genres:
-    filtered_df = filtered_df[
-        filtered_df['genre'].apply(
-            lambda g: any(genre.strip() in selected_genres for genre in str(g).split(','))
-        )
-    ]
-
-# 📋 Display Filtered Results
-st.subheader(f"Filtered Movies ({len(filtered_df):,} results)")
-st.dataframe(filtered_df[['title', 'genre', 'runtime', 'imdb_score', 'votes']].reset_index(drop=True))
+# Duration ranges as (lo, hi, lo_inclusive, hi_inclusive)
+duration_ranges = {
+    "All": (None, None),
+    "< 2 hrs": (None, 120, True, False),
+    "2–3 hrs": (120, 180),
+    "> 3 hrs": (180, None, False, True),
+}
+spec = FilterSpec.make(
+    genres=selected_genres or None,
+    genre_mode="all" if genre_match == "All selected genres" else "any",
+    runtime=duration_ranges[duration_option],
+    min_score=min_rating,
+    min_votes=min_votes,
+    year=release_years,
+)
+cache_stats = engine.stats()
+st.caption(f"Filter cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+           f"{cache_stats['size']}/{cache_stats['maxsize']} entries")
+
+# 📋 Display Filtered Results (one page at a time, see paging.py)
+st.subheader(f"Filtered Movies ({engine.count(spec):,} results)")
+paged_table(engine, spec, ['title', 'year', 'genre', 'runtime', 'imdb_score', 'votes'], key="filtered")
 
 
 # Display Key Metrics
 st.header("🎯 Key Metrics")
 
+# running statistics merged over the (year, genre) cells, no scan of the rows (see running_stats.py)
+summary = engine.summary()
+
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.metric(label="Total Movies", value=f"{len(df):,}")
+    st.metric(label="Total Movies", value=f"{summary.rows:,}")
 
 with col2:
-    avg_score = df['imdb_score'].mean()
+    avg_score = summary['imdb_score'].mean
     st.metric(label="Average IMDb Score", value=f"{avg_score:.2f}")
 
 with col3:
-    highest_score = df['imdb_score'].max()
+    highest_score = summary['imdb_score'].max
     st.metric(label="Highest IMDb Score", value=f"{highest_score:.1f}")
     
 col4, col5, col6 = st.columns(3)
 
 with col4:
-    total_votes = df['votes'].sum()
+    total_votes = summary['votes'].total
     st.metric(label="Total Votes", value=f"{total_votes:,}")
 
 with col5:
-    longest_runtime = df['runtime'].max()
+    longest_runtime = summary['runtime'].max
     st.metric(label="Longest Runtime (min)", value=f"{longest_runtime:.0f}")
 
 with col6:
-    shortest_runtime = df['runtime'].min()
+    shortest_runtime = summary['runtime'].min
     st.metric(label="Shortest Runtime (min)", value=f"{shortest_runtime:.0f}")
 
+if approximate:
+    sketch = engine.sketch()
+    scores, votes = sketch.quantiles['imdb_score'], sketch.quantiles['votes']
+    distinct = sketch.titles.estimate()
+    st.caption(f"≈ {distinct:,.0f} distinct titles (± {2 * sketch.titles.relative_error * distinct:,.0f}); "
+               f"median IMDb score ≈ {scores.quantile(0.5):.1f}, 90% of movies have ≤ {votes.quantile(0.9):,.0f} votes "
+               f"(rank error ± {max(scores.rank_error, votes.rank_error):.1%})")
+
 
 
 # 1.Top 10 Movies by Rating and Voting Counts:
 st.header("1.Top 10 Movies by Voting Counts")
-top_by_votes = df.sort_values(by='votes', ascending=False).head(10)
+top_by_votes = sections['top_by_votes']
 st.bar_chart(top_by_votes.set_index('title')['votes'])
 
 st.header("Top 10 Movies by IMDb Score")
 
-top_by_score = df.sort_values(by='imdb_score', ascending=False).head(10)
+top_by_score = sections['top_by_score']
 
-fig, ax = plt.subplots(figsize=(10, 6))
-bars = ax.barh(top_by_score['title'], top_by_score['imdb_score'], color='mediumseagreen')
-ax.set_xlabel('IMDb Score')
-ax.set_title('Top 10 Movies by IMDb Score')
-ax.invert_yaxis()  # Highest score on top
+def draw_top_by_score(top_by_score):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bars = ax.barh(top_by_score['title'], top_by_score['imdb_score'], color='mediumseagreen')
+    ax.set_xlabel('IMDb Score')
+    ax.set_title('Top 10 Movies by IMDb Score')
+    ax.invert_yaxis()  # Highest score on top
 
-# Optional: Add score labels at end of bars
-for bar in bars:
-    width = bar.get_width()
-    ax.text(width + 0.05, bar.get_y() + bar.get_height()/2, f'{width:.1f}', va='center')
+    # Optional: Add score labels at end of bars
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.05, bar.get_y() + bar.get_height()/2, f'{width:.1f}', va='center')
+    return fig
 
-st.pyplot(fig)
+st.image(figures.get("top_by_score", draw_top_by_score, top_by_score, key=version), width="stretch")
 
 # 2. Genre Distribution: (Animation, Adventure, Fantasy, Family)
 st.header("2.Genre Distribution")
-filtered_genres = df[df['genre'].isin(['Animation', 'Adventure', 'Fantasy', 'Family'])]
-genre_counts = filtered_genres['genre'].value_counts()
+genre_counts = sections['genre_counts']
 st.bar_chart(genre_counts)
 
 # 3. Average Duration by Genre:
 st.header("3.Average Duration by Genre:")
-genre_duration = filtered_genres.groupby('genre')['runtime'].mean()
+genre_duration = sections['genre_duration']
 st.bar_chart(genre_duration)
 
 # 4. Voting Trends by Genre:
 st.header("4.Voting Trends by Genre:")
-genre_votes = df.groupby('genre')['votes'].mean().sort_values(ascending=False)
+genre_votes = sections['genre_votes']
 st.bar_chart(genre_votes.head(10))
 
 # 5. Rating Distribution:
 st.header("5.Rating Distribution:")
-filtered_df = df[df['imdb_score'] > 0]  # 0 ரேட்டிங்கைத் தவிர்க்க
-fig, ax = plt.subplots()
-sns.histplot(filtered_df['imdb_score'], bins=20, kde=True, ax=ax)
-st.pyplot(fig)
+def draw_rating_distribution(engine):
+    df = engine.frame(columns=['imdb_score'])
+    filtered_df = df[df['imdb_score'] > 0]  # 0 ரேட்டிங்கைத் தவிர்க்க
+    fig, ax = plt.subplots()
+    sns.histplot(filtered_df['imdb_score'], bins=20, kde=True, ax=ax)
+    return fig
+
+def draw_rating_histogram(histogram):
+    bins = histogram.frame()
+    fig, ax = plt.subplots()
+    ax.bar(bins['start'], bins['count'], width=bins['end'] - bins['start'], align='edge', edgecolor='white')
+    ax.set_xlabel('imdb_score')
+    ax.set_ylabel('Count')
+    return fig
+
+if approximate:
+    # fixed 0.5-point bins: the counts are exact, where a score falls inside its bin is not
+    st.image(figures.get("rating_histogram", draw_rating_histogram, sketch.histogram, key=version), width="stretch")
+    st.caption("Approximate mode: counts per 0.5-point bin merged from the sketches of every year and genre; "
+               "a 0 rating would fall in the first bin.")
+else:
+    st.image(figures.get("rating_distribution", draw_rating_distribution, engine, key=version), width="stretch")
 
 # 6. Genre-Based Rating Leaders:
 st.header("6.Genre-Based Rating Leaders:")
-top_genre_movies = filtered_genres.loc[filtered_genres.groupby('genre')['imdb_score'].idxmax()]
+top_genre_movies = sections['rating_leaders']
 st.table(top_genre_movies[['genre', 'title', 'imdb_score']])
 
 # 7. Most Popular Genres by Voting:
 st.header("7.Most Popular Genres by Voting:")
-genre_total_votes = df.groupby('genre')['votes'].sum().nlargest(5)
+genre_total_votes = sections['genre_total_votes']
 
-fig, ax = plt.subplots()
-ax.pie(genre_total_votes, labels=genre_total_votes.index, autopct="%1.1f%%", startangle=90)
-ax.set_title("Top 5 Genres by Total Votes")
-ax.axis('equal')  # Ensures pie is drawn as a circle
+def draw_genre_votes_pie(genre_total_votes):
+    fig, ax = plt.subplots()
+    ax.pie(genre_total_votes, labels=genre_total_votes.index, autopct="%1.1f%%", startangle=90)
+    ax.set_title("Top 5 Genres by Total Votes")
+    ax.axis('equal')  # Ensures pie is drawn as a circle
+    return fig
 
-st.pyplot(fig)
+st.image(figures.get("genre_votes_pie", draw_genre_votes_pie, genre_total_votes, key=version), width="stretch")
 
 
 # 8. Duration Extremes:
 st.header("8.Duration Extremes:")
-duration_stats = df[['title', 'runtime']].sort_values('runtime')
-st.table(pd.concat([duration_stats.head(3), duration_stats.tail(3)]))
+st.table(sections['duration_extremes'])
 
 # 9. Ratings by Genre:
 st.header("9.Ratings by Genre (Heatmap Comparison)")
 
-# Step 1: Split multi-genre strings and explode
-df_genres = df.copy()
-df_genres['genre'] = df_genres['genre'].str.split(',\s*')  # split by comma + optional space
-df_exploded = df_genres.explode('genre')
-
-# Step 2: Filter only the target genres
-target_genres = ['Animation', 'Adventure', 'Fantasy', 'Family']
-filtered_genres = df_exploded[df_exploded['genre'].isin(target_genres)]
-
-# Step 3: Group by genre and compute average IMDb score
-genre_ratings = filtered_genres.groupby('genre')['imdb_score'].mean().sort_values(ascending=False)
+# Step 1-3: average IMDb score per target genre (precomputed)
+genre_ratings = sections['genre_ratings']
 
 # Step 4: Create a 1-row heatmap
-heatmap_data = pd.DataFrame(genre_ratings).T  # transpose
-fig, ax = plt.subplots(figsize=(8, 2))
-sns.heatmap(heatmap_data, annot=True, fmt=".2f", cmap="YlGnBu", cbar=True, ax=ax)
-ax.set_ylabel('')
-ax.set_xlabel('Genre')
-ax.set_title('Average IMDb Rating by Genre')
-
-st.pyplot(fig)
+def draw_genre_heatmap(genre_ratings):
+    heatmap_data = pd.DataFrame(genre_ratings).T  # transpose
+    fig, ax = plt.subplots(figsize=(8, 2))
+    sns.heatmap(heatmap_data, annot=True, fmt=".2f", cmap="YlGnBu", cbar=True, ax=ax)
+    ax.set_ylabel('')
+    ax.set_xlabel('Genre')
+    ax.set_title('Average IMDb Rating by Genre')
+    return fig
+
+st.image(figures.get("genre_heatmap", draw_genre_heatmap, genre_ratings, key=version), width="stretch")
 st.dataframe(genre_ratings.round(3).reset_index().rename(columns={'genre': 'Genre', 'imdb_score': 'Avg IMDb Score'}))
 
 # 10. Correlation Analysis:
 st.header("10.Correlation Analysis:")
-fig, ax = plt.subplots()
-sns.scatterplot(data=df, x='imdb_score', y='votes', alpha=0.5, ax=ax)
-st.pyplot(fig)
+def draw_correlation(engine):
+    df = engine.frame(columns=['imdb_score', 'votes'])
+    fig, ax = plt.subplots()
+    sns.scatterplot(data=df, x='imdb_score', y='votes', alpha=0.5, ax=ax)
+    return fig
+
+st.image(figures.get("correlation", draw_correlation, engine, key=version), width="stretch")
+st.caption(f"Pearson correlation of IMDb score and votes: {summary.correlation:.2f} "
+           f"over {summary.pair.count:,} rated movies")
 
 
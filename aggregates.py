@@ -0,0 +1,119 @@
+"""Precomputed aggregates for the widget-independent sections of 00.app.py.
+
+Sections 1-4 and 6-9 of the dashboard only depend on the dataset, not on
+any widget, so the ingest step computes them once and saves them to a
+small JSON artifact tagged with the dataset's content hash. The same
+movies read partition by partition hash differently, so the artifact also
+lists the version of the partitioned archive it was computed with. The
+dashboard reads the artifact and falls back to computing live when it is
+missing or was built from a different dataset version.
+"""
+import json
+import os
+
+import pandas as pd
+
+from dataset import dataset_version
+from query import FilterSpec, MovieQuery, QueryEngine
+
+TARGET_GENRES = ['Animation', 'Adventure', 'Fantasy', 'Family']
+
+
+def aggregates_path(movies_path):
+    return os.path.splitext(movies_path)[0] + ".aggregates.json"
+
+
+def compute_aggregates(movies):
+    """Every precomputable section, as pandas objects keyed by name.
+
+    `movies` is a query engine (see query.py) or the movie DataFrame; only
+    top-k and per-genre group-bys are asked of it.
+    """
+    engine = movies if isinstance(movies, QueryEngine) else MovieQuery(movies)
+    target = [genre for genre in engine.genres if genre in TARGET_GENRES]
+
+    def leaders():
+        rows = []
+        for genre in target:
+            best = engine.top_k('imdb_score', 1, ['title', 'imdb_score'], FilterSpec.make(genres=[genre]))
+            rows.append(best.assign(genre=pd.Categorical([genre], categories=engine.genres)))
+        return pd.concat(rows)[['genre', 'title', 'imdb_score']]
+
+    aggregates = {
+        # 1. top 10 by votes and by score
+        "top_by_votes": engine.top_k('votes', 10, ['title', 'votes']),
+        "top_by_score": engine.top_k('imdb_score', 10, ['title', 'imdb_score']),
+        # 2. genre distribution
+        "genre_counts": engine.group_by_genre('title', 'count', genres=target).sort_values(ascending=False, kind='stable'),
+        # 3. average duration by genre
+        "genre_duration": engine.group_by_genre('runtime', 'mean', genres=target),
+        # 4. voting trends by genre
+        "genre_votes": engine.group_by_genre('votes', 'mean').sort_values(ascending=False),
+        # 6. genre-based rating leaders
+        "rating_leaders": leaders(),
+        # 7. top 5 genres by total votes
+        "genre_total_votes": engine.group_by_genre('votes', 'sum').nlargest(5),
+        # 8. duration extremes
+        "duration_extremes": pd.concat([
+            engine.top_k('runtime', 3, ['title', 'runtime'], largest=False),
+            engine.top_k('runtime', 3, ['title', 'runtime']).iloc[::-1],
+        ]),
+        # 9. average rating by genre (heatmap)
+        "genre_ratings": engine.group_by_genre('imdb_score', 'mean', genres=target).sort_values(ascending=False),
+    }
+    # tables are stored without their row labels, so drop them here as well
+    return {
+        name: value.reset_index(drop=True) if isinstance(value, pd.DataFrame) else value
+        for name, value in aggregates.items()
+    }
+
+
+def _encode(value):
+    if isinstance(value, pd.Series):
+        return {"kind": "series", "name": value.name, "index_name": value.index.name,
+                "index": value.index.astype(object).tolist(), "values": value.tolist()}
+    return {"kind": "frame", "columns": value.columns.tolist(), "data": value.astype(object).values.tolist()}
+
+
+def _decode(value):
+    if value["kind"] == "series":
+        index = pd.Index(value["index"], name=value["index_name"])
+        return pd.Series(value["values"], index=index, name=value["name"])
+    return pd.DataFrame(value["data"], columns=value["columns"])
+
+
+def write_aggregates(movies, path, version=None, aliases=()):
+    """Compute the aggregates of `movies` (a frame or an engine) and save them with the dataset version.
+
+    `aliases` are other versions of the same movies, such as the version of
+    their partitioned archive, that the artifact serves as well.
+    """
+    version = version or getattr(movies, "version", None) or dataset_version(movies)
+    artifact = {
+        "version": version,
+        "aliases": [alias for alias in aliases if alias != version],
+        "aggregates": {name: _encode(value) for name, value in compute_aggregates(movies).items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+
+
+def read_aggregates(path, version):
+    """The saved aggregates, or None when the artifact is missing or stale."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if version != artifact.get("version") and version not in artifact.get("aliases", []):
+        return None
+    return {name: _decode(value) for name, value in artifact["aggregates"].items()}
+
+
+def load_aggregates(movies, path, version=None):
+    """Aggregates from the artifact when it matches `movies`, computed live otherwise."""
+    version = version or getattr(movies, "version", None) or dataset_version(movies)
+    saved = read_aggregates(path, version)
+    if saved is not None:
+        return saved
+    return compute_aggregates(movies)
@@ -1,23 +1,42 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 
-# Load Data
-@st.cache_data
-def load_data(file_path):
+from figures import FigureCache
+from paging import paged_table
+from query import FilterSpec
+from reloading import DatasetWatcher
+from title_words import HEIGHT, MAX_WORDS, WIDTH, TitleWords
+
+# Load Data (one query engine per process, shared by every session; see engines.py),
+# swapped for a new one when the file changes (see reloading.py)
+@st.cache_resource
+def load_watcher(file_path):
     try:
-        df = pd.read_csv(file_path)
-        return df
+        return DatasetWatcher(file_path)
     except FileNotFoundError:
         st.error(f"Error: Could not find the file at {file_path}. Please check the file path.")
         return None
 
-file_path = 'merged_movies_sorted.csv'
-movies_df = load_data(file_path)
+@st.cache_resource(max_entries=1)
+def load_title_words(_engine, version):
+    # title words tokenized once per dataset version
+    return TitleWords(_engine.column('title'))
+
+@st.cache_resource
+def load_figures():
+    # rendered wordclouds shared by every session, keyed on the filter
+    return FigureCache()
+
+# Wordcloud caps (see title_words.py): fewer words and a smaller canvas keep big selections fast
+def draw_wordcloud(title_words, rows):
+    wordcloud = title_words.wordcloud(rows, max_words=MAX_WORDS, width=WIDTH, height=HEIGHT)
+    return None if wordcloud is None else wordcloud.to_image()
 
-if movies_df is not None:
+file_path = 'movies.csv'
+watcher = load_watcher(file_path)
+engine = watcher.current() if watcher is not None else None
+
+if engine is not None:
     # Title
     st.title('IMDb Movies Dashboard')
 
@@ -25,54 +44,91 @@ if movies_df is not None:
     st.sidebar.header('Filters')
 
     # Genre Filter
-    genres = movies_df['genre'].unique().tolist()
+    genres = engine.genres
     genre_filter = st.sidebar.multiselect('Select Genre(s)', genres, default=genres)
 
     # Year Slider
-    min_year = int(movies_df['runtime'].min())
-    max_year = int(movies_df['runtime'].max())
+    min_year, max_year = map(int, engine.bounds('runtime'))
     year_range = st.sidebar.slider('Select your Duration', min_year, max_year, (min_year, max_year))
 
+    # Release Year Slider (only when the data spans more than one year)
+    first_year, last_year = map(int, engine.bounds('year'))
+    release_years = (first_year, last_year)
+    if first_year < last_year:
+        release_years = st.sidebar.slider('Select Release Year', first_year, last_year, release_years)
+
     # Search Box
     search_term = st.sidebar.text_input('Search Movie Title')
+    fuzzy_search = st.sidebar.checkbox('Typo-tolerant search (best matches first)')
+
+    # Approximate mode: the histograms answered from sketches merged per (year, genre) cell (see sketches.py)
+    approximate = st.sidebar.toggle('Approximate mode', help='Answer the histograms from mergeable sketches '
+                                                             'instead of scanning the filtered movies.')
 
     # Filter Data
-    filtered_df = movies_df[movies_df['genre'].isin(genre_filter)]
-    filtered_df = filtered_df[
-        (filtered_df['runtime'] >= year_range[0]) & (filtered_df['runtime'] <= year_range[1])
-    ]
-    filtered_df = filtered_df[filtered_df['title'].str.contains(search_term, case=False)]
+    version = engine.version
+    spec = FilterSpec.make(genres=genre_filter, runtime=year_range, title=search_term, fuzzy=fuzzy_search,
+                           year=release_years)
+    cache_stats = engine.stats()
+    st.sidebar.caption(f"Filter cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
 
     # Movie Data Table
     st.subheader('A list of movies that you have filtered for your needs :')
-    st.dataframe(filtered_df[['title', 'runtime', 'imdb_score', 'votes', 'genre']])
+    paged_table(engine, spec, ['title', 'year', 'runtime', 'imdb_score', 'votes', 'genre'], key="movies")
+
+    if approximate:
+        sketch = engine.sketch(spec)
+
+        # IMDb Score Distribution (fixed 0.5-point bins, exact counts)
+        st.subheader('IMDb Score Distribution')
+        bins = sketch.histogram.frame().assign(imdb_score=lambda bins: bins['start'] + 0.25)
+        fig = px.bar(bins, x='imdb_score', y='count', title='IMDb Score Distribution (approximate)')
+        fig.update_traces(width=0.5)
+        st.plotly_chart(fig)
+        scores = sketch.quantiles['imdb_score']
+        if scores.count:
+            st.caption(f"Counts per 0.5-point bin. Median ≈ {scores.quantile(0.5):.1f} "
+                       f"(rank error ± {scores.rank_error:.1%}).")
 
-    # IMDb Score Distribution Histogram
-    st.subheader('IMDb Score Distribution')
-    fig = px.histogram(filtered_df, x='imdb_score', nbins=20, title='IMDb Score Distribution')
-    st.plotly_chart(fig)
+        # Votes Distribution (20 bins estimated from the quantile sketch)
+        st.subheader('Votes Distribution')
+        votes = sketch.quantiles['votes']
+        bins = votes.histogram(20).assign(votes=lambda bins: (bins['start'] + bins['end']) / 2)
+        fig2 = px.bar(bins, x='votes', y='count', error_y='error', title='Votes Distribution (approximate)')
+        st.plotly_chart(fig2)
+        if votes.count:
+            st.caption(f"Each bar within ± {votes.bin_error * votes.count:,.0f} movies "
+                       f"({votes.bin_error:.1%} of {votes.count:,}); ≈ {sketch.titles.estimate():,.0f} "
+                       f"distinct titles (± {2 * sketch.titles.relative_error:.0%}).")
+    else:
+        filtered_df = engine.frame(spec, ['imdb_score', 'votes'])
 
-    # Votes Distribution Histogram
-    st.subheader('Votes Distribution')
-    fig2 = px.histogram(filtered_df, x='votes', nbins=20, title='Votes Distribution')
-    st.plotly_chart(fig2)
+        # IMDb Score Distribution Histogram
+        st.subheader('IMDb Score Distribution')
+        fig = px.histogram(filtered_df, x='imdb_score', nbins=20, title='IMDb Score Distribution')
+        st.plotly_chart(fig)
+
+        # Votes Distribution Histogram
+        st.subheader('Votes Distribution')
+        fig2 = px.histogram(filtered_df, x='votes', nbins=20, title='Votes Distribution')
+        st.plotly_chart(fig2)
 
     # Movie Titles Wordcloud
     st.subheader('Wordcloud of Movie Titles')
-    text = ' '.join(filtered_df['title'].dropna().tolist())
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
-
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    st.pyplot(plt)
+    title_words = load_title_words(engine, version)
+    rows = engine.rows(spec)
+    key = (version, spec, MAX_WORDS, WIDTH, HEIGHT)
+    image = load_figures().get("wordcloud", draw_wordcloud, title_words, rows, key=key)
+    if image is not None:
+        st.image(image, width="stretch")
 
-    # Key Metrics
+    # Key Metrics (merged running statistics when the filters keep whole genre/year cells)
     st.subheader('Key Metrics')
+    summary = engine.summary(spec)
     col1, col2, col3 = st.columns(3)
-    col1.metric('Total Movies', len(filtered_df))
-    col2.metric('Average IMDb Score', round(filtered_df['imdb_score'].mean(), 2))
-    col3.metric('Average Votes', int(filtered_df['votes'].mean()))
+    col1.metric('Total Movies', summary.rows)
+    col2.metric('Average IMDb Score', round(summary['imdb_score'].mean, 2) if summary['imdb_score'].count else None)
+    col3.metric('Average Votes', int(summary['votes'].mean) if summary.rows else 0)
 
     # Footer
     st.markdown('---')
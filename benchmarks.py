@@ -0,0 +1,715 @@
+"""Benchmarks for the scrape, cleaning and dashboard data paths.
+
+    python benchmarks.py extract --items 1000
+    python benchmarks.py paginate --items 500 --delay 300
+    python benchmarks.py cleaning --rows 1000000
+    python benchmarks.py columnar --rows 1000000
+    python benchmarks.py genres --rows 1000000
+    python benchmarks.py sorted --rows 1000000 10000000
+    python benchmarks.py sessions --rows 1000000 --sessions 1 10 50
+    python benchmarks.py wordcloud --rows 10000 100000
+    python benchmarks.py search --rows 1000000
+    python benchmarks.py paging --rows 10000 100000 1000000
+    python benchmarks.py engines --rows 1000000
+    python benchmarks.py partitions --rows 100000 --years 1 5 25
+    python benchmarks.py reload --rows 1000000 --append 1000
+    python benchmarks.py stats --rows 1000000
+    python benchmarks.py sketches --rows 1000000 10000000 --years 25
+"""
+import argparse
+import functools
+import http.server
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    """Best wall-clock time of `repeat` calls, and the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+@contextmanager
+def serve_directory(directory):
+    """Serve `directory` on a free localhost port for the duration of the block."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+
+
+def fixture_item(position):
+    return (
+        f'<li><a href="/title/tt{position:07d}/"><h3 class="ipc-title__text">{position}. Movie {position}</h3></a>'
+        f'<div>2024</div><span class="dli-title-metadata-item">2024</span>'
+        f'<span class="dli-title-metadata-item">{1 + position % 2}h {position % 60}m</span>'
+        f'<span class="dli-title-metadata-item">PG</span>'
+        f'<span class="ipc-rating-star--rating">{position % 10}.{position % 7}</span>'
+        f'<span class="ipc-rating-star--voteCount"> ({position % 900}K)</span></li>'
+    )
+
+
+def write_fixture_page(directory, items):
+    path = os.path.join(directory, "search.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body><ul>" + "".join(fixture_item(i) for i in range(1, items + 1)) + "</ul></body></html>")
+    return path
+
+
+def write_paginated_page(directory, items, delay_ms, page_size=50):
+    """A page that shows `page_size` items and appends the next batch `delay_ms` after each "more" click."""
+    path = os.path.join(directory, "paged.html")
+    template = "".join(fixture_item(i) for i in range(1, items + 1))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"""<html><body>
+<div>1-{min(page_size, items)} of {items:,}</div>
+<template id="rows"><ul>{template}</ul></template>
+<ul id="list"></ul>
+<span id="more">{page_size} more</span>
+<script>
+const all = document.getElementById("rows").content.querySelectorAll("li");
+const list = document.getElementById("list");
+let shown = 0;
+function show() {{
+  for (const li of Array.from(all).slice(shown, shown + {page_size})) list.appendChild(li.cloneNode(true));
+  shown = Math.min(shown + {page_size}, all.length);
+  if (shown >= all.length) document.getElementById("more").remove();
+}}
+show();
+document.getElementById("more").onclick = () => setTimeout(show, {delay_ms});
+</script></body></html>""")
+    return path
+
+
+def bench_paginate(args):
+    """Adaptive "more" clicking against a page that loads each batch after a delay."""
+    import logging
+
+    import pagination
+    import scrape
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with tempfile.TemporaryDirectory() as directory:
+        write_paginated_page(directory, args.items, args.delay)
+        with serve_directory(directory) as base_url:
+            driver = scrape.make_driver()
+            try:
+                start = time.perf_counter()
+                driver.get(f"{base_url}/paged.html")
+                controller = pagination.LoadMoreController(
+                    driver, '//*[@id="list"]/li', scrape.MORE_XPATH, max_clicks=args.max_clicks)
+                pages = controller.load_all()
+                elapsed = time.perf_counter() - start
+            finally:
+                driver.quit()
+
+    fixed = 5 + 5 * (len(pages) - 1)
+    print(f"loaded {pages[-1].items} of {args.items} items in {len(pages)} pages: {elapsed:.1f}s "
+          f"(fixed 5 s sleeps would take {fixed}s)")
+
+
+def bench_extract(args):
+    """Per-element `element.text` reads vs one execute_script call."""
+    from selenium.webdriver.common.by import By
+
+    import scrape
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_fixture_page(directory, args.items)
+        with serve_directory(directory) as base_url:
+            driver = scrape.make_driver()
+            try:
+                driver.get(f"{base_url}/search.html")
+
+                def per_element():
+                    return [element.text.split("\n") for element in driver.find_elements(By.XPATH, "//ul/li")]
+
+                old, old_rows = timed(per_element)
+                new, new_rows = timed(scrape.extract_items, driver, "//ul/li")
+            finally:
+                driver.quit()
+
+    print(f"items: {len(new_rows)} (per-element read {len(old_rows)})")
+    print(f"element.text per li : {old * 1000:9.1f} ms")
+    print(f"single execute_script: {new * 1000:9.1f} ms  ({old / new:.1f}x)")
+
+
+# Row-wise helpers from `tidb_cleaning using colab.py`, kept as the baseline.
+def convert_to_minutes(runtime):
+    match = re.match(r'(?:(\d+)h)?\s*(?:(\d+)m)?', runtime)
+    if match:
+        hours = int(match.group(1)) if match.group(1) else 0
+        minutes = int(match.group(2)) if match.group(2) else 0
+        return hours * 60 + minutes
+    return None
+
+
+def convert_votes(vote):
+    if isinstance(vote, str):
+        vote = vote.strip("()").replace(',', '').strip()
+        vote = re.sub(r'[()]', '', vote)
+        if 'K' in vote:
+            return int(float(vote.replace('K', '')) * 1000)
+        elif vote.isdigit():
+            return int(vote)
+    return 0
+
+
+def synthetic_raw(rows, seed=0):
+    """A raw scrape frame of `rows` rows built by resampling the saved genre CSVs."""
+    import pandas as pd
+
+    raw = pd.concat([pd.read_csv(path, dtype=str, keep_default_na=False)
+                     for path in ("Fantasy_IMDb2024_list.csv", "Family_IMDb2024_list.csv")])
+    return raw.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def bench_cleaning(args):
+    """Row-wise convert_to_minutes/convert_votes vs the vectorized cleaning module."""
+    import pandas as pd
+
+    import cleaning
+
+    raw = synthetic_raw(args.rows)
+
+    def row_wise():
+        out = [[re.sub(r'^\d+\.\s*', '', row[0])] + [convert_to_minutes(row[1])] + list(row[2:-1])
+               + [convert_votes(row[-1])] for row in raw.itertuples(index=False)]
+        return pd.DataFrame(out, columns=["title", "runtime", "imdb_score", "votes"])
+
+    old, _ = timed(row_wise, repeat=1)
+    new, _ = timed(cleaning.clean_frame, raw, "Fantasy", repeat=1)
+    print(f"rows: {args.rows:,}")
+    print(f"row-wise  : {old:7.2f}s  {args.rows / old:12,.0f} rows/s")
+    print(f"vectorized: {new:7.2f}s  {args.rows / new:12,.0f} rows/s  ({old / new:.1f}x)")
+
+
+def synthetic_dataset(rows, seed=0):
+    """A merged-dataset frame of `rows` rows resampled from merged_movies_sorted.csv."""
+    import pandas as pd
+
+    df = pd.read_csv("merged_movies_sorted.csv")
+    return df.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+# shared start of the scripts run in a fresh process: rss() is the resident memory in MiB (Linux)
+RSS_PRELUDE = """
+import os
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+"""
+
+LOAD_SCRIPT = RSS_PRELUDE + """
+import sys, time
+import pandas as pd
+import pyarrow.feather
+import dataset
+
+before = rss()
+start = time.perf_counter()
+df = dataset.read_columnar(sys.argv[2]) if sys.argv[1] == "columnar" else pd.read_csv(sys.argv[2])
+seconds = time.perf_counter() - start
+print(seconds, rss() - before, df.memory_usage(deep=True).sum() / 2**20)
+"""
+
+
+def bench_columnar(args):
+    """CSV parse vs memory-mapped Feather load: time and resident memory, each in a fresh process (Linux)."""
+    import dataset
+
+    df = synthetic_dataset(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "movies.csv")
+        df.to_csv(csv_path, index=False)
+        dataset.write_columnar(df, dataset.columnar_path(csv_path))
+        print(f"rows: {args.rows:,}")
+        for kind, path in (("csv", csv_path), ("columnar", dataset.columnar_path(csv_path))):
+            out = subprocess.run([sys.executable, "-c", LOAD_SCRIPT, kind, path], check=True,
+                                 capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            seconds, rss, frame = map(float, out.stdout.split())
+            size = os.path.getsize(path) / 2**20
+            print(f"{kind:<9} file {size:7.1f} MiB  load {seconds * 1000:8.1f} ms  "
+                  f"RSS +{rss:7.1f} MiB  frame {frame:7.1f} MiB")
+
+
+def synthetic_movies(rows, seed=0):
+    """A normalized movie table of `rows` rows resampled from movies.csv."""
+    import pandas as pd
+
+    df = pd.read_csv("movies.csv")
+    return df.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def bench_genres(args):
+    """Row-wise lambda genre filter vs the GenreIndex bitmask."""
+    import numpy as np
+
+    from indexes import GenreIndex
+
+    df = synthetic_movies(args.rows)
+    selected = ["Fantasy", "Family"]
+
+    def lambda_filter():
+        return df['genre'].apply(lambda g: any(genre.strip() in selected for genre in str(g).split(',')))
+
+    old, expected = timed(lambda_filter, repeat=1)
+    build, index = timed(GenreIndex, df, repeat=1)
+    new, got = timed(index.match, selected)
+    every, _ = timed(index.match, selected, "all")
+    assert np.array_equal(expected.to_numpy(), got)
+    print(f"rows: {args.rows:,}")
+    print(f"lambda filter   : {old * 1000:9.2f} ms")
+    print(f"index build     : {build * 1000:9.2f} ms (once per dataset)")
+    print(f"bitmask any-of  : {new * 1000:9.2f} ms  ({old / new:,.0f}x)")
+    print(f"bitmask all-of  : {every * 1000:9.2f} ms")
+
+
+def synthetic_numeric(rows, seed=0):
+    """runtime/imdb_score/votes columns of `rows` rows resampled from movies.csv (no titles)."""
+    import numpy as np
+    import pandas as pd
+
+    import dataset
+
+    source = dataset.compact(pd.read_csv("movies.csv"))
+    pick = np.random.default_rng(seed).integers(0, len(source), rows)
+    return pd.DataFrame({column: source[column].to_numpy()[pick] for column in ("runtime", "imdb_score", "votes")})
+
+
+def bench_sorted(args):
+    """Full sorts and boolean scans vs the ColumnIndexes argsort permutations."""
+    from indexes import ColumnIndexes
+
+    for rows in args.rows:
+        df = synthetic_numeric(rows)
+        build, index = timed(ColumnIndexes, df, repeat=1)
+
+        def scan():
+            f = df[df['runtime'] < 120]
+            return f[(f['imdb_score'] >= 7.0) & (f['votes'] >= 10000)]
+
+        cases = [
+            ("top-10 votes", lambda: df.sort_values(by='votes', ascending=False).head(10),
+             lambda: df.iloc[index['votes'].top(10)]),
+            ("top-10 score", lambda: df.sort_values(by='imdb_score', ascending=False).head(10),
+             lambda: df.iloc[index['imdb_score'].top(10)]),
+            ("runtime extremes", lambda: df['runtime'].sort_values().iloc[[0, 1, 2, -3, -2, -1]],
+             lambda: (index['runtime'].bottom(3), index['runtime'].top(3))),
+            ("< 2 hrs, >= 7.0, >= 10K votes", scan,
+             lambda: df.iloc[index.select({'runtime': (None, 120, True, False),
+                                           'imdb_score': (7.0, None), 'votes': (10000, None)})]),
+        ]
+        print(f"rows: {rows:,}  (index build {build:.2f}s, once per dataset)")
+        for name, old_fn, new_fn in cases:
+            old, _ = timed(old_fn)
+            new, _ = timed(new_fn)
+            print(f"  {name:<30} {old * 1000:9.2f} ms -> {new * 1000:8.3f} ms  ({old / new:,.0f}x)")
+
+
+SESSIONS_SCRIPT = RSS_PRELUDE + """
+import pickle, sys
+import pandas as pd
+import dataset
+from query import FilterSpec, MovieQuery
+
+mode, path, sessions = sys.argv[1], sys.argv[2], int(sys.argv[3])
+movies = dataset.read_columnar(path)
+spec = FilterSpec.make(runtime=(None, 120, True, False), min_score=7.0)
+if mode == "shared":
+    movies = dataset.freeze(movies)
+    query = MovieQuery(movies)
+before = rss()
+held = []
+for _ in range(sessions):
+    if mode == "copied":
+        # st.cache_data: every session gets its own unpickled copy, then copies again to filter
+        df = pickle.loads(pickle.dumps(movies))
+        filtered = df.copy()
+        filtered = filtered[(filtered["runtime"] < 120) & (filtered["imdb_score"] >= 7.0)]
+        held.append((df, filtered))
+    else:
+        # st.cache_resource: every session reads the same frame, a filter is a row array
+        held.append((movies, query.rows(spec)))
+print(rss() - before)
+"""
+
+
+def bench_sessions(args):
+    """Resident memory of N sessions holding the dataset: per-session copies vs one shared frame (Linux)."""
+    import dataset
+
+    df = synthetic_movies(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "movies.feather")
+        dataset.write_columnar(df, path)
+        print(f"movies: {len(df):,}")
+        for sessions in args.sessions:
+            line = []
+            for mode in ("copied", "shared"):
+                out = subprocess.run([sys.executable, "-c", SESSIONS_SCRIPT, mode, path, str(sessions)], check=True,
+                                     capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+                line.append(f"{mode} RSS +{float(out.stdout):8.1f} MiB")
+            print(f"  {sessions:>4} sessions: " + "   ".join(line))
+
+
+def bench_wordcloud(args):
+    """WordCloud.generate over the joined titles vs summed per-title counts + generate_from_frequencies."""
+    import numpy as np
+    from wordcloud import WordCloud
+
+    from title_words import MAX_WORDS, TitleWords
+
+    for rows in args.rows:
+        titles = synthetic_movies(rows)['title']
+        selected = np.arange(0, rows, 2)
+
+        def generate():
+            text = ' '.join(titles.iloc[selected].dropna().tolist())
+            return WordCloud(width=800, height=400, background_color='white').generate(text)
+
+        old, _ = timed(generate, repeat=1)
+        build, words = timed(TitleWords, titles, repeat=1)
+        counts, _ = timed(words.frequencies, selected)
+        new, _ = timed(words.wordcloud, selected, repeat=1)
+        print(f"titles: {rows:,}  (tokenize once {build * 1000:.0f} ms)")
+        print(f"  generate(text)            {old * 1000:9.1f} ms")
+        print(f"  summed counts             {counts * 1000:9.1f} ms")
+        print(f"  generate_from_frequencies {new * 1000:9.1f} ms  ({old / new:.1f}x, max {MAX_WORDS} words instead of 200)")
+
+
+def synthetic_titles(rows, seed=0):
+    """`rows` distinct titles of 1-4 random words taken from the movies.csv titles."""
+    import numpy as np
+    import pandas as pd
+
+    words = sorted({word for title in pd.read_csv("movies.csv")['title'] for word in re.findall(r"\w+", title)})
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 5, rows)
+    picked = np.array(words, dtype=object)[rng.integers(0, len(words), lengths.sum())]
+    return [f"{' '.join(title)} {i}" for i, title in enumerate(np.split(picked, np.cumsum(lengths)[:-1]))]
+
+
+def bench_search(args):
+    """str.contains over every title vs the TrigramIndex, literal and fuzzy."""
+    import pandas as pd
+
+    from indexes import TrigramIndex
+
+    titles = synthetic_titles(args.rows)
+    series = pd.Series(titles)
+    build, index = timed(TrigramIndex, titles, repeat=1)
+    print(f"titles: {args.rows:,}  (index build {build:.2f}s, once per dataset)")
+    for query in ("wild robot", "robot", "ro", "x", "(", "moanna", "wild robott"):
+        old, _ = timed(lambda: series.str.contains(query, case=False, regex=False))
+        new, found = timed(index.search, query)
+        fuzzy, (ranked, _) = timed(index.fuzzy, query)
+        print(f"  {query!r:<14} contains {old * 1000:7.1f} ms  index {new * 1000:7.3f} ms ({len(found):>7,} rows)"
+              f"  fuzzy {fuzzy * 1000:6.2f} ms ({len(ranked)} ranked)")
+
+
+def bench_paging(args):
+    """Serializing the whole filtered table (st.dataframe) vs one sorted page of it."""
+    from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+    import dataset
+    from query import FilterSpec, MovieQuery
+
+    columns = ['title', 'genre', 'runtime', 'imdb_score', 'votes']
+    for rows in args.rows:
+        movies = dataset.freeze(dataset.compact(synthetic_movies(rows)))
+        query = MovieQuery(movies)
+        spec = FilterSpec.make()
+        query.sorted_rows(spec, 'votes', True)  # sort order is cached per filter
+
+        def whole():
+            return convert_pandas_df_to_arrow_bytes(query.frame(spec)[columns].reset_index(drop=True))
+
+        def page():
+            return convert_pandas_df_to_arrow_bytes(query.page(spec, 3, sort='votes', descending=True)[columns])
+
+        old, old_bytes = timed(whole)
+        new, new_bytes = timed(page)
+        print(f"rows: {rows:>9,}  whole table {old * 1000:8.1f} ms {len(old_bytes) / 2**20:8.2f} MiB"
+              f"   page {new * 1000:6.2f} ms {len(new_bytes) / 2**10:6.1f} KiB")
+
+
+ENGINE_SCRIPT = RSS_PRELUDE + """
+import sys, time
+import dataset, engines
+from query import FilterSpec
+
+kind, path = sys.argv[1], sys.argv[2]
+before = rss()
+start = time.perf_counter()
+if kind == "arrow":
+    engine = engines.ArrowEngine([path])
+elif kind == "partitioned":
+    engine = engines.PartitionedEngine(path)
+else:
+    movies = dataset.freeze(dataset.read_columnar(path))
+    engine = engines.MovieQuery(movies, dataset.frames_version([movies]))
+opened = time.perf_counter() - start
+spec = FilterSpec.make(genres=["Family"], runtime=(None, 120, True, False), min_score=6.0)
+start = time.perf_counter()
+engine.count(spec)
+engine.page(spec, 0, 50, "votes", True)
+engine.top_k("imdb_score", 10, ["title", "imdb_score"])
+engine.group_by_genre("votes", "mean")
+queried = time.perf_counter() - start
+print(opened, queried, rss() - before)
+"""
+
+
+def bench_engines(args):
+    """pandas vs arrow vs partitioned engine: open time, first queries and resident memory (fresh process each), plus parity."""
+    import dataset
+    import engines
+    import partitions
+
+    df = synthetic_movies(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "movies.feather")
+        dataset.write_columnar(df, path)
+        partitioned_path = os.path.join(directory, "movies_partitions")
+        partitions.write_partitions(df, partitioned_path)
+        print(f"movies: {args.rows:,}")
+        for kind in engines.ENGINES:
+            source = partitioned_path if kind == "partitioned" else path
+            out = subprocess.run([sys.executable, "-c", ENGINE_SCRIPT, kind, source], check=True,
+                                 capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            opened, queried, rss = map(float, out.stdout.split())
+            print(f"  {kind:<11} open {opened * 1000:8.1f} ms  queries {queried * 1000:8.1f} ms  RSS +{rss:7.1f} MiB")
+
+        movies = dataset.freeze(dataset.read_columnar(path))
+        differences, total = engines.check_parity([engines.MovieQuery(movies), engines.ArrowEngine([path])])
+        print(f"  parity: {total} queries, {len(differences)} differences")
+
+
+def bench_partitions(args):
+    """One genre-year query on archives of growing size: flat Feather file vs year/genre partitions."""
+    import pandas as pd
+
+    import dataset
+    import engines
+    import partitions
+    from query import FilterSpec
+
+    movies = synthetic_movies(args.rows)
+    print(f"movies per year: {args.rows:,}")
+    for years in args.years:
+        archive = pd.concat([movies.assign(year=2024 - i) for i in range(years)], ignore_index=True)
+        spec = FilterSpec.make(genres=["Family"], year=(2024, 2024), min_score=6.0)
+        with tempfile.TemporaryDirectory() as directory:
+            flat_path = os.path.join(directory, "movies.feather")
+            dataset.write_columnar(archive, flat_path)
+            partitioned_path = os.path.join(directory, "movies_partitions")
+            partitions.write_partitions(archive, partitioned_path)
+
+            def query(engine):
+                return engine.count(spec), engine.page(spec, 0, 50, "votes", True)
+
+            # a fresh engine per run, so every run opens the files again; the version is not hashed
+            flat, (count, _) = timed(lambda: query(engines.ArrowEngine([flat_path], version="-")))
+            pruned, (pruned_count, _) = timed(lambda: query(engines.PartitionedEngine(partitioned_path)))
+            engine = engines.PartitionedEngine(partitioned_path)
+            query(engine)
+            assert count == pruned_count
+            print(f"  {years:>3} years ({len(archive):>11,} rows): flat {flat * 1000:8.1f} ms   "
+                  f"partitioned {pruned * 1000:7.1f} ms ({len(engine.tables)} of {len(engine.manifest)} "
+                  f"partitions opened, {count:,} matches)")
+
+
+def bench_reload(args):
+    """Rows appended to movies.csv: full reload vs ingesting only the new tail."""
+    import dataset
+    import engines
+    import reloading
+    from query import FilterSpec
+
+    movies = synthetic_movies(args.rows + args.append)
+    head, tail = movies.iloc[:args.rows], movies.iloc[args.rows:]
+    search = FilterSpec.make(title="moana")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "movies.csv")
+        head.to_csv(path, index=False)
+        watcher = reloading.DatasetWatcher(path, "pandas")
+        watcher.current().rows(search)  # title index built, as after the first search
+        with open(path, "a", newline="") as f:
+            tail.to_csv(f, index=False, header=False)
+
+        def full():
+            engine = engines.open_engine(path, "pandas")
+            engine.rows(search)
+            return engine
+
+        old, fresh = timed(full, repeat=1)
+        new, engine = timed(watcher.current, repeat=1)
+        assert engine.version == fresh.version and watcher.stats()["appends"] == 1
+        differences, total = engines.check_parity([fresh, engine])
+        print(f"movies: {args.rows:,} + {args.append:,} appended")
+        print(f"  full reload (parse, indexes, title index) {old * 1000:9.1f} ms")
+        print(f"  append: new rows only                     {new * 1000:9.1f} ms  ({old / new:.0f}x)")
+        print(f"  parity with the full reload: {total} queries, {len(differences)} differences")
+
+
+def bench_stats(args):
+    """Key Metrics: aggregates scanned from the rows vs running statistics merged per (year, genre) cell."""
+    import dataset
+    from query import FilterSpec, MovieQuery
+
+    movies = dataset.freeze(dataset.compact(synthetic_movies(args.rows)))
+    engine = MovieQuery(movies)
+    panels = {
+        "all movies (00.app.py)": FilterSpec(),
+        "Family, full runtime range (app1.py)": FilterSpec.make(genres=["Family"], runtime=(0, 1000)),
+    }
+
+    def scan(spec):
+        frame = engine.frame(spec, ['imdb_score', 'votes', 'runtime'])
+        return (len(frame), frame['imdb_score'].mean(), frame['imdb_score'].max(), frame['votes'].sum(),
+                frame['runtime'].max(), frame['runtime'].min(), frame['imdb_score'].corr(frame['votes']))
+
+    build, cells = timed(lambda: engine.cell_stats, repeat=1)
+    print(f"movies: {args.rows:,}, {len(cells)} cells built in {build * 1000:.1f} ms (once per dataset)")
+    for name, spec in panels.items():
+        engine.rows(spec)  # both sides start from cached rows
+        old, _ = timed(scan, spec)
+        new, _ = timed(engine.summary, spec)  # that both agree is checked in tests/test_running_stats.py
+        print(f"  {name:<38} scan {old * 1000:8.2f} ms   merged cells {new * 1000:6.3f} ms  ({old / new:,.0f}x)")
+
+
+def bench_sketches(args):
+    """Distribution charts: scanned from the rows vs merged per-cell sketches, with the observed errors."""
+    import numpy as np
+    import dataset
+    from query import FilterSpec, MovieQuery
+
+    for rows in args.rows:
+        movies = synthetic_movies(rows)
+        rng = np.random.default_rng(0)
+        titles = np.array(synthetic_titles(rows // 2), dtype=object)
+        movies = movies.assign(title=titles[rng.integers(0, len(titles), rows)],
+                               year=rng.integers(2025 - args.years, 2025, rows),
+                               # spread the votes so their quantiles are not all resampled ties
+                               votes=(movies['votes'] * rng.lognormal(0, 0.5, rows)).round())
+        engine = MovieQuery(dataset.freeze(dataset.compact(movies)))
+        build, cells = timed(lambda: engine.cell_sketches, repeat=1)
+        print(f"movies: {rows:,}, {len(cells)} cells sketched in {build * 1000:.0f} ms (once per dataset)")
+        for name, spec in {"all movies": FilterSpec(), "Family": FilterSpec.make(genres=["Family"])}.items():
+            engine.rows(spec)  # both sides start from cached rows
+
+            def scan():
+                frame = engine.frame(spec, ['title', 'imdb_score', 'votes'])
+                votes = frame['votes'].to_numpy(dtype=np.float64)
+                return (np.histogram(frame['imdb_score'], bins=20)[0], np.histogram(votes, bins=20)[0],
+                        np.quantile(votes, [0.5, 0.9]), frame['title'].nunique(), np.sort(votes))
+
+            old, (_, votes_bins, _, distinct, votes) = timed(scan)
+            new, sketch = timed(engine.sketch, spec)
+            quantiles = sketch.quantiles['votes']
+            # how far each q is from the ranks its answer holds (many movies share a vote count)
+            q = np.linspace(0.01, 0.99, 99)
+            answers = [quantiles.quantile(p) for p in q]
+            low, high = (np.searchsorted(votes, answers, side=side) / len(votes) for side in ("left", "right"))
+            rank_error = np.maximum(np.maximum(low - q, q - high), 0).max()
+            bin_error = np.abs(quantiles.histogram(20)['count'].to_numpy() - votes_bins).max() / len(votes)
+            distinct_error = abs(sketch.titles.estimate() / distinct - 1)
+            print(f"  {name:<11} scan {old * 1000:8.1f} ms   merged sketches {new * 1000:6.1f} ms  ({old / new:,.0f}x)")
+            print(f"              errors: quantile rank {rank_error:.2%} (bound {quantiles.rank_error:.2%}), "
+                  f"votes bins {bin_error:.2%} (bound {quantiles.bin_error:.2%}), "
+                  f"distinct titles {distinct_error:.2%} (2 s.e. {2 * sketch.titles.relative_error:.2%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="name", required=True)
+
+    extract = sub.add_parser("extract", help=bench_extract.__doc__)
+    extract.add_argument("--items", type=int, default=1000)
+    extract.set_defaults(run=bench_extract)
+
+    paginate = sub.add_parser("paginate", help=bench_paginate.__doc__)
+    paginate.add_argument("--items", type=int, default=500)
+    paginate.add_argument("--delay", type=int, default=300, help="milliseconds before each batch appears")
+    paginate.add_argument("--max-clicks", type=int)
+    paginate.set_defaults(run=bench_paginate)
+
+    clean = sub.add_parser("cleaning", help=bench_cleaning.__doc__)
+    clean.add_argument("--rows", type=int, default=1_000_000)
+    clean.set_defaults(run=bench_cleaning)
+
+    columnar = sub.add_parser("columnar", help=bench_columnar.__doc__)
+    columnar.add_argument("--rows", type=int, default=1_000_000)
+    columnar.set_defaults(run=bench_columnar)
+
+    genres = sub.add_parser("genres", help=bench_genres.__doc__)
+    genres.add_argument("--rows", type=int, default=1_000_000)
+    genres.set_defaults(run=bench_genres)
+
+    sorted_ = sub.add_parser("sorted", help=bench_sorted.__doc__)
+    sorted_.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    sorted_.set_defaults(run=bench_sorted)
+
+    sessions = sub.add_parser("sessions", help=bench_sessions.__doc__)
+    sessions.add_argument("--rows", type=int, default=1_000_000)
+    sessions.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    sessions.set_defaults(run=bench_sessions)
+
+    wordcloud = sub.add_parser("wordcloud", help=bench_wordcloud.__doc__)
+    wordcloud.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    wordcloud.set_defaults(run=bench_wordcloud)
+
+    search = sub.add_parser("search", help=bench_search.__doc__)
+    search.add_argument("--rows", type=int, default=1_000_000)
+    search.set_defaults(run=bench_search)
+
+    paging = sub.add_parser("paging", help=bench_paging.__doc__)
+    paging.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    paging.set_defaults(run=bench_paging)
+
+    engines = sub.add_parser("engines", help=bench_engines.__doc__)
+    engines.add_argument("--rows", type=int, default=1_000_000)
+    engines.set_defaults(run=bench_engines)
+
+    partitioned = sub.add_parser("partitions", help=bench_partitions.__doc__)
+    partitioned.add_argument("--rows", type=int, default=100_000, help="movies per year")
+    partitioned.add_argument("--years", type=int, nargs="+", default=[1, 5, 25])
+    partitioned.set_defaults(run=bench_partitions)
+
+    reload = sub.add_parser("reload", help=bench_reload.__doc__)
+    reload.add_argument("--rows", type=int, default=1_000_000)
+    reload.add_argument("--append", type=int, default=1_000)
+    reload.set_defaults(run=bench_reload)
+
+    stats = sub.add_parser("stats", help=bench_stats.__doc__)
+    stats.add_argument("--rows", type=int, default=1_000_000)
+    stats.set_defaults(run=bench_stats)
+
+    sketches = sub.add_parser("sketches", help=bench_sketches.__doc__)
+    sketches.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    sketches.add_argument("--years", type=int, default=25)
+    sketches.set_defaults(run=bench_sketches)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
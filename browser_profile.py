@@ -0,0 +1,94 @@
+"""Chrome profile for the scrapers: headless, with heavy resources blocked.
+
+We only read the text of the result list, so posters, fonts, trailers and
+ad/tracking scripts are pure cost. The profile blocks them by resource type
+(through URL patterns and Chrome content settings) and by domain, and turns
+on Chrome's performance log so every page load can report how many bytes
+went over the wire and how long the page took.
+"""
+import json
+from dataclasses import dataclass, field
+
+RESOURCE_PATTERNS = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+}
+
+THIRD_PARTY_DOMAINS = [
+    "doubleclick.net",
+    "googlesyndication.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "amazon-adsystem.com",
+    "scorecardresearch.com",
+    "fls-na.amazon.com",
+    "unagi.amazon.com",
+]
+
+
+@dataclass
+class PageStats:
+    bytes: int = 0
+    load_seconds: float = 0.0
+
+
+@dataclass
+class BrowserProfile:
+    headless: bool = True
+    block_types: tuple = ("image", "font", "media")
+    blocked_domains: list = field(default_factory=lambda: list(THIRD_PARTY_DOMAINS))
+    window_size: str = "1920,1080"
+    measure: bool = True
+
+    def blocked_url_patterns(self):
+        patterns = [pattern for kind in self.block_types for pattern in RESOURCE_PATTERNS[kind]]
+        return patterns + [f"*{domain}*" for domain in self.blocked_domains]
+
+    def options(self):
+        from selenium import webdriver
+
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={self.window_size}")
+        if "image" in self.block_types:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        if self.measure:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return options
+
+    def launch(self):
+        """Start Chrome with this profile; the same driver can then load any number of URLs."""
+        from selenium import webdriver
+
+        driver = webdriver.Chrome(options=self.options())
+        patterns = self.blocked_url_patterns()
+        if patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        return driver
+
+
+def page_stats(driver):
+    """Bytes received since the last call and the load time of the current page.
+
+    Reading the performance log drains it, so call this once before a page
+    load to reset the counter and once after to read it.
+    """
+    received = 0
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        entries = []
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            received += int(message["params"].get("encodedDataLength", 0))
+
+    load_ms = driver.execute_script(
+        "const nav = performance.getEntriesByType('navigation')[0];"
+        "return nav ? nav.loadEventEnd - nav.startTime : null;"
+    )
+    return PageStats(bytes=received, load_seconds=(load_ms or 0) / 1000)
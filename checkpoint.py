@@ -0,0 +1,151 @@
+"""Checkpoint store for incremental, resumable scraping.
+
+The store is a small SQLite file keyed on the IMDb title id. While a job
+runs, every finished result page is saved straight away, so a crashed run
+picks up from the pages it already has. When the job finishes, its rows are
+compared with what was written last time and only new or changed rows (for
+example an updated vote count) are merged into the genre CSV; the rest of
+the file is left alone.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+COLUMNS = ["Title", "Runtime", "IMDB_Score", "Votes"]
+DEFAULT_PATH = "scrape_checkpoint.sqlite"
+
+SCHEMA = """
+create table if not exists titles (
+    job text, key text, title text, runtime text, score text, votes text,
+    primary key (job, key)
+);
+create table if not exists pending (
+    job text, page integer, position integer, key text,
+    title text, runtime text, score text, votes text,
+    primary key (job, page, position)
+);
+create table if not exists pages (
+    job text, page integer, primary key (job, page)
+);
+"""
+
+
+def strip_rank(title):
+    """'12. Moana 2' -> 'Moana 2'."""
+    return re.sub(r'^\d+\.\s*', '', str(title))
+
+
+def row_key(row):
+    return row.get("TitleId") or strip_rank(row["Title"])
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+class CheckpointStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def job_key(job):
+        return f"{job.genre.lower()}:{job.year}"
+
+    def completed_pages(self, job):
+        """Pages of an interrupted run of `job` that are already saved."""
+        with self.lock:
+            rows = self.db.execute("select page from pages where job = ?", (self.job_key(job),))
+            return {page for (page,) in rows}
+
+    def pending_rows(self, job):
+        with self.lock:
+            rows = self.db.execute(
+                "select key, title, runtime, score, votes from pending where job = ? order by page, position",
+                (self.job_key(job),),
+            ).fetchall()
+        return [dict(zip(["TitleId"] + COLUMNS, row)) for row in rows]
+
+    def save_page(self, job, page, rows):
+        """Record one fetched page; it is skipped if the run has to be resumed."""
+        key = self.job_key(job)
+        with self.lock, self.db:
+            self.db.execute("delete from pending where job = ? and page = ?", (key, page))
+            self.db.executemany(
+                "insert into pending values (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, page, position, row_key(row), *(_text(row[c]) for c in COLUMNS))
+                 for position, row in enumerate(rows)],
+            )
+            self.db.execute("insert or ignore into pages values (?, ?)", (key, page))
+
+    def changed_rows(self, job, rows):
+        """The rows that are new or differ from the last completed run."""
+        with self.lock:
+            known = {
+                key: values
+                for key, *values in self.db.execute(
+                    "select key, runtime, score, votes from titles where job = ?", (self.job_key(job),)
+                )
+            }
+        return [
+            row for row in rows
+            if known.get(row_key(row)) != [_text(row[c]) for c in COLUMNS[1:]]
+        ]
+
+    def finish(self, job, rows):
+        """Remember `rows` as written and clear the run's pending pages."""
+        key = self.job_key(job)
+        with self.lock, self.db:
+            self.db.executemany(
+                "insert or replace into titles values (?, ?, ?, ?, ?, ?)",
+                [(key, row_key(row), *(_text(row[c]) for c in COLUMNS)) for row in rows],
+            )
+            self.db.execute("delete from pending where job = ?", (key,))
+            self.db.execute("delete from pages where job = ?", (key,))
+
+    def commit_job(self, job, rows):
+        """Merge the new/changed `rows` of a finished job into its CSV; return how many were written."""
+        changed = self.changed_rows(job, rows)
+        merge_csv(job.output_path, changed)
+        self.finish(job, changed)
+        return len(changed)
+
+    def close(self):
+        self.db.close()
+
+
+def merge_csv(path, rows):
+    """Update changed rows of `path` in place and append new ones.
+
+    Rows are matched on the title without its rank prefix. When nothing
+    existing changes, the new rows are simply appended to the file.
+    """
+    if not rows:
+        return
+    new = pd.DataFrame(rows, columns=COLUMNS)
+    if not os.path.exists(path):
+        new.to_csv(path, index=False, encoding="utf-8")
+        return
+
+    old = pd.read_csv(path, dtype=str, keep_default_na=False).reindex(columns=COLUMNS, fill_value="")
+    old_keys = old["Title"].map(strip_rank)
+    new_keys = new["Title"].map(strip_rank)
+    updated = old_keys.isin(new_keys)
+
+    if not updated.any():
+        new.to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
+        return
+
+    by_key = new.set_index(new_keys)
+    by_key = by_key[~by_key.index.duplicated(keep="last")]
+    old.loc[updated, COLUMNS] = by_key.loc[old_keys[updated], COLUMNS].astype(str).values
+    merged = pd.concat([old, new[~new_keys.isin(old_keys)]], ignore_index=True)
+
+    tmp_path = f"{path}.tmp"
+    merged.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, path)
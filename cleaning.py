@@ -0,0 +1,83 @@
+"""Vectorized cleaning of the raw scrape columns.
+
+These replace the row-wise `convert_to_minutes` / `convert_votes` helpers
+and the per-row `re.sub` of the Colab notebook with `.str.extract` calls
+that work on whole columns at once:
+
+    "12. Moana 2" -> "Moana 2"
+    "1h 40m" -> 100, "2h" -> 120, "45m" -> 45
+    " (91K)" -> 91000, "(2.7K)" -> 2700, "1.2M" -> 1200000, "1,234" -> 1234
+
+Runtime, score and vote strings repeat a lot, so each column is parsed
+once per distinct value and the results are broadcast back to the rows.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = {"Title": "title", "Runtime": "runtime", "IMDB_Score": "imdb_score", "Votes": "votes"}
+COLUMNS = ["title", "runtime", "imdb_score", "votes", "genre"]
+
+VOTE_MULTIPLIERS = {"": 1, "K": 1_000, "M": 1_000_000}
+
+
+def _per_unique(parse):
+    """Run `parse` on the distinct values of a column only and spread the result back."""
+    @functools.wraps(parse)
+    def wrapper(values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        # code -1 (missing) picks the extra trailing slot, i.e. parse(<NA>)
+        parsed = parse(pd.Series(list(uniques) + [None], dtype=object))
+        return parsed.take(codes).set_axis(values.index)
+    return wrapper
+
+
+def clean_titles(titles):
+    """Drop the "12. " rank prefix the search page puts in front of every title."""
+    return titles.astype("string").str.replace(r'^\d+\.\s*', '', regex=True)
+
+
+@_per_unique
+def runtime_to_minutes(runtimes):
+    """Parse "1h 40m" / "2h" / "45m" into minutes; anything unparseable becomes <NA>."""
+    parts = runtimes.astype("string").str.extract(r'^\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?\s*$')
+    hours = pd.to_numeric(parts[0])
+    minutes = pd.to_numeric(parts[1])
+    total = hours.fillna(0) * 60 + minutes.fillna(0)
+    # plain numbers are already minutes (e.g. a column that was cleaned before)
+    plain = pd.to_numeric(runtimes, errors="coerce")
+    total = total.where(hours.notna() | minutes.notna(), plain)
+    return total.round().astype("Int64")
+
+
+@_per_unique
+def votes_to_int(votes):
+    """Parse " (91K)", "(2.7K)", "1.2M" or "1,234" into a vote count; missing votes count as 0."""
+    text = votes.astype("string").str.replace(r'[(),\s]', '', regex=True).str.upper()
+    parts = text.str.extract(r'^(\d+(?:\.\d+)?)([KM]?)$')
+    count = pd.to_numeric(parts[0]) * parts[1].map(VOTE_MULTIPLIERS).astype("float64")
+    return count.round().fillna(0).astype("Int64")
+
+
+@_per_unique
+def scores_to_float(scores):
+    """IMDb ratings as floats; blank or unparseable ratings become NaN."""
+    return pd.to_numeric(scores.astype("string").str.strip(), errors="coerce").astype("float64")
+
+
+def clean_frame(raw, genre=None):
+    """Clean a raw scrape (CSV or TiDB table) into title, runtime, imdb_score, votes, genre.
+
+    `raw` may use either the CSV headers (Title, Runtime, ...) or the
+    lowercase column names of the TiDB tables.
+    """
+    raw = raw.rename(columns=RAW_COLUMNS)
+    df = pd.DataFrame({
+        "title": clean_titles(raw["title"]),
+        "runtime": runtime_to_minutes(raw["runtime"]),
+        "imdb_score": scores_to_float(raw["imdb_score"]),
+        "votes": votes_to_int(raw["votes"]),
+    })
+    df["genre"] = genre if genre is not None else raw.get("genre", np.nan)
+    return df[COLUMNS]
@@ -0,0 +1,250 @@
+"""Load the merged movie dataset for the dashboards.
+
+Next to each merged CSV the pipeline writes an uncompressed Feather (Arrow
+IPC) file with compact dtypes:
+
+    title       string
+    runtime     uint16
+    imdb_score  float32
+    votes       uint32
+    genre       category
+    year        uint16
+
+The dashboards load that file through a memory map, so there is no text
+parsing on a cache miss, and fall back to the CSV when the columnar file
+is missing or older than the CSV.
+
+Each dashboard process keeps one copy of the dataset, frozen with
+`freeze()` and shared by every session through `st.cache_resource`;
+filters select rows by position instead of copying the frame.
+
+The merged CSV has one row per (movie, genre). The dashboards read the
+normalized `movies.csv` instead: one row per movie, a boolean column per
+genre and a readable "Fantasy, Family" `genre` string. Per-genre
+statistics go through `genre_long()`, which counts a movie once in each of
+its genres. A movie is a (title, release year) pair; merged files written
+before the year column existed only hold 2024 releases.
+
+    python dataset.py columnar 1.merged_movies_sorted.csv   # write 1.merged_movies_sorted.feather
+    python dataset.py movies merged_movies_sorted.csv       # write movies.csv (+ .feather, partitions, aggregates)
+"""
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+GENRES = ['Fantasy', 'Animation', 'Adventure', 'Family']
+MOVIES_CSV = "movies.csv"
+DEFAULT_YEAR = 2024
+
+DTYPES = {
+    "runtime": "uint16",
+    "imdb_score": "float32",
+    "votes": "uint32",
+    "genre": "category",
+    "year": "uint16",
+}
+# counts stored as 0 when missing, so they fit their unsigned dtypes
+ZERO_WHEN_MISSING = ("runtime", "votes")
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".feather"
+
+
+def compact(df):
+    """Cast the dataset columns to the compact dtypes above."""
+    df = df.copy()
+    for column in ZERO_WHEN_MISSING:
+        df[column] = pd.to_numeric(df[column]).fillna(0)
+    df["imdb_score"] = pd.to_numeric(df["imdb_score"])
+    df["title"] = df["title"].astype(str)
+    if "year" in df:
+        df["year"] = pd.to_numeric(df["year"])
+    return df.astype({column: dtype for column, dtype in DTYPES.items() if column in df}).reset_index(drop=True)
+
+
+def dataset_version(df):
+    """Content hash of a frame; changes whenever any value does.
+
+    Hashed after `compact`, so the CSV and its columnar copy get the same version.
+    """
+    return frames_version([df])
+
+
+def frames_version(frames):
+    """`dataset_version` of the frames stacked in order, hashed one frame at a time."""
+    return digest_version(frames_digest(frames))
+
+
+def frames_digest(frames, digest=None):
+    """The running hash behind `frames_version`, continued from `digest` when given.
+
+    Rows are hashed one by one, so appending rows to a hashed table only
+    needs the new rows: `frames_digest([tail], frames_digest([head]))` is
+    the digest of head and tail stacked.
+    """
+    digest = digest.copy() if digest is not None else hashlib.sha1()
+    for df in frames:
+        digest.update(pd.util.hash_pandas_object(compact(df), index=False).to_numpy().tobytes())
+    return digest
+
+
+def digest_version(digest):
+    return digest.hexdigest()[:16]
+
+
+def genre_columns(df):
+    """The boolean genre membership columns of a normalized movie table."""
+    return [column for column in df.columns if df[column].dtype == bool]
+
+
+def normalize(merged, year=DEFAULT_YEAR):
+    """One row per (title, year) from the (movie, genre) rows of the merged dataset.
+
+    `year` is the release year of merged files that have no year column.
+    """
+    if 'year' not in merged:
+        merged = merged.assign(year=year)
+    seen = merged['genre'].dropna().unique()
+    genres = [g for g in GENRES if g in seen] + sorted(set(seen) - set(GENRES))
+
+    flags = pd.crosstab([merged['title'], merged['year']], merged['genre']).reindex(columns=genres, fill_value=0) > 0
+    movies = merged.groupby(['title', 'year'], sort=False).agg(
+        runtime=('runtime', 'first'),
+        imdb_score=('imdb_score', 'first'),
+        votes=('votes', 'max'),
+    )
+    flags = flags.reindex(movies.index)
+    # "Fantasy, Family" in vocabulary order
+    movies['genre'] = flags.dot(pd.Index(genres) + ', ').str[:-2]
+    return movies.join(flags).reset_index()
+
+
+def genre_long(movies):
+    """A (movie, genre) row for every genre each movie belongs to, for per-genre group-bys."""
+    genres = genre_columns(movies)
+    rows, cols = np.nonzero(movies[genres].to_numpy())
+    long = movies.drop(columns=genres + ['genre']).iloc[rows].reset_index(drop=True)
+    long['genre'] = pd.Categorical.from_codes(cols, genres)
+    return long
+
+
+def write_atomic(write, path):
+    """Call `write(tmp_path)`, then move the result over `path` in one step.
+
+    Readers see either the old file or the new one, never half of it, and
+    one that has the old file memory-mapped keeps its copy.
+    """
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_columnar(df, path):
+    from pyarrow import feather
+
+    # uncompressed so the file can be memory-mapped without decoding
+    write_atomic(lambda tmp_path: feather.write_feather(compact(df), tmp_path, compression="uncompressed"), path)
+
+
+def read_columnar(path):
+    from pyarrow import feather
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_dataset(csv_path):
+    """The dataset from its columnar copy when that is up to date, else from the CSV."""
+    path = columnar_path(csv_path)
+    if os.path.exists(path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+    ):
+        try:
+            return read_columnar(path)
+        except ImportError:
+            pass
+    return pd.read_csv(csv_path)
+
+
+def freeze(df):
+    """The same frame over read-only column arrays, safe to share between sessions.
+
+    No data is copied; any in-place write to the result raises instead of
+    changing what other sessions see.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, np.dtype):
+            array = values.to_numpy()
+            array.flags.writeable = False
+            columns[column] = array
+        else:
+            columns[column] = values.array
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def append_rows(movies, rows):
+    """`movies` with `rows` (same columns) added at the end, in the dtypes of `movies`.
+
+    Categorical columns keep their categories and gain the new values after them.
+    Missing runtimes and votes become 0 as in `compact` when `movies` stores
+    them as integers.
+    """
+    rows = rows[movies.columns].reset_index(drop=True)
+    for column in ZERO_WHEN_MISSING:
+        if column in rows and movies[column].dtype.kind in "iu":
+            rows[column] = pd.to_numeric(rows[column]).fillna(0)
+    columns = {}
+    for column in movies.columns:
+        values = movies[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            new = pd.Index(rows[column].dropna().unique()).difference(values.cat.categories, sort=False)
+            categories = values.cat.categories.append(new)
+            columns[column] = pd.concat([values.cat.set_categories(categories),
+                                         rows[column].astype(pd.CategoricalDtype(categories))], ignore_index=True)
+        else:
+            columns[column] = pd.concat([values, rows[column].astype(values.dtype)], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def write_movies(merged, path=MOVIES_CSV, year=DEFAULT_YEAR):
+    """Write the normalized movie table as CSV and, when pyarrow is there, its columnar copy."""
+    movies = normalize(merged, year)
+    write_atomic(lambda tmp_path: movies.to_csv(tmp_path, index=False, float_format="%g", lineterminator="\r\n"),
+                 path)
+    try:
+        write_columnar(movies, columnar_path(path))
+    except ImportError:
+        pass
+    return movies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the merged dataset for the dashboards.")
+    parser.add_argument("command", choices=["columnar", "movies"])
+    parser.add_argument("csv", nargs="?", default="merged_movies_sorted.csv")
+    parser.add_argument("--out", default=MOVIES_CSV, help="output of the movies command")
+    parser.add_argument("--year", type=int, default=DEFAULT_YEAR, help="release year of rows without one")
+    args = parser.parse_args(argv)
+
+    if args.command == "columnar":
+        write_columnar(pd.read_csv(args.csv), columnar_path(args.csv))
+        print(f"{args.csv} -> {columnar_path(args.csv)}")
+    else:
+        from aggregates import aggregates_path, write_aggregates
+        from partitions import partitions_path, write_partitions
+
+        movies = write_movies(pd.read_csv(args.csv), args.out, args.year)
+        manifest = write_partitions(movies, partitions_path(args.out))
+        write_aggregates(movies, aggregates_path(args.out), aliases=[manifest["version"]])
+        print(f"{args.csv} -> {args.out} ({len(movies):,} movies), "
+              f"{partitions_path(args.out)} ({len(manifest['partitions'])} partitions), {aggregates_path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
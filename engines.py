@@ -0,0 +1,349 @@
+"""Pluggable query engines for the dashboards.
+
+    pandas  the whole movie table in one DataFrame, answered from in-memory
+            indexes (query.MovieQuery) - the default
+    arrow   the columnar files memory-mapped and queried with
+            pyarrow.compute: a query reads only the columns it touches and
+            only result rows are turned into pandas
+    partitioned
+            the same over the year/genre archive of partitions.py, opening
+            only the partitions the filter can match
+
+Both implement query.QueryEngine (filter, sort, page, top-k, group-by), so
+the dashboards and the aggregates do not care which one they get. Pick one
+with IMDB_ENGINE=pandas|arrow|partitioned. `check` runs the same queries
+through the engines and reports every difference; the partitioned engine
+is compared with an arrow engine over its partition files, which hold the
+same rows in the same order:
+
+    python engines.py check movies.csv
+"""
+import argparse
+import os
+import sys
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from dataset import MOVIES_CSV, columnar_path, frames_version, freeze, load_dataset
+from partitions import MANIFEST, partitions_path
+from query import ALL, FilterSpec, MovieQuery, QueryEngine
+from running_stats import MovieStats
+from sketches import MovieSketch
+
+BATCH_ROWS = 65_536
+
+
+def _mask(table, spec):
+    """Boolean array of the rows of `table` passing every filter but a fuzzy title; None when nothing is filtered."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    conditions = []
+    for column, bounds in spec.predicates().items():
+        lo, hi, lo_inclusive, hi_inclusive = (tuple(bounds) + (True, True))[:4]
+        values = table[column]
+        if pa.types.is_floating(values.type):
+            # compare in the column's precision, like SortedIndex.bounds
+            lo = None if lo is None else pa.scalar(lo, values.type)
+            hi = None if hi is None else pa.scalar(hi, values.type)
+        if lo is not None:
+            conditions.append((pc.greater_equal if lo_inclusive else pc.greater)(values, lo))
+        if hi is not None:
+            conditions.append((pc.less_equal if hi_inclusive else pc.less)(values, hi))
+    if spec.genres is not None:
+        combine = pc.and_ if spec.genre_mode == "all" else pc.or_
+        member = table[spec.genres[0]]
+        for genre in spec.genres[1:]:
+            member = combine(member, table[genre])
+        conditions.append(member)
+    if spec.title and not spec.fuzzy:
+        conditions.append(pc.match_substring(pc.utf8_lower(table['title']), spec.title))
+    if not conditions:
+        return None
+    mask = conditions[0]
+    for condition in conditions[1:]:
+        mask = pc.and_(mask, condition)
+    return pc.fill_null(mask, False).to_numpy()
+
+
+class ArrowEngine(QueryEngine):
+    """Queries over one or more Feather files without loading them into pandas."""
+
+    def __init__(self, paths, version=None, maxsize=128):
+        import pyarrow as pa
+        from pyarrow import feather
+
+        super().__init__(version, maxsize)
+        tables = [feather.read_table(path, memory_map=True) for path in paths]
+        self.table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+        self.genres = [field.name for field in self.table.schema if pa.types.is_boolean(field.type)]
+        if self.version is None:
+            # same content hash as the pandas path, one batch in memory at a time
+            self.version = frames_version(batch.to_pandas() for batch in self.table.to_batches(BATCH_ROWS))
+        self._title_index = None
+
+    def _gather(self, rows, columns=None):
+        """pyarrow Table of `columns` (all when None) at the row positions `rows` (all rows when None)."""
+        table = self.table if columns is None else self.table.select(list(columns))
+        return table if rows is None else table.take(rows)
+
+    def column(self, name, rows=None):
+        return self._gather(rows, [name]).column(0).to_numpy()
+
+    def take(self, rows, columns=None):
+        frame = self._gather(rows, columns).to_pandas()
+        frame.index = pd.Index(rows)
+        return frame
+
+    def _evaluate(self, spec):
+        if spec.genres is not None and not spec.genres:
+            return np.arange(0)
+        mask = _mask(self.table, spec)
+        if spec.fuzzy and spec.title:
+            matches, _ = self.title_index.fuzzy(spec.title, candidates=mask)
+            return matches
+        return np.arange(self.table.num_rows) if mask is None else np.flatnonzero(mask)
+
+    @property
+    def title_index(self):
+        # only fuzzy search needs the titles in memory, so build it on first use
+        if self._title_index is None:
+            from indexes import TrigramIndex
+
+            self._title_index = TrigramIndex(self.table['title'].to_pylist())
+        return self._title_index
+
+    def _sort(self, spec, sort, descending):
+        import pyarrow.compute as pc
+
+        rows = np.sort(self.rows(spec))  # ties in row order, also for fuzzy results
+        values = self._gather(rows, [sort]).column(0)
+        if sort == 'title':
+            values = pc.utf8_lower(values)
+        order = pc.array_sort_indices(values, order="descending" if descending else "ascending")
+        return rows[order.to_numpy()]
+
+
+class PartitionedEngine(ArrowEngine):
+    """An ArrowEngine over a partitioned archive (see partitions.py) that opens only the partitions a query can match.
+
+    Row positions run through the partitions in manifest order, as if they
+    were one table; a partition file is memory-mapped on first use.
+    """
+
+    def __init__(self, directory, maxsize=128):
+        from partitions import Manifest
+
+        QueryEngine.__init__(self, None, maxsize)
+        self.manifest = Manifest(directory)
+        self.version = self.manifest.version
+        self.genres = self.manifest.genres
+        self.tables = {}
+        self.title_indexes = {}
+
+    @cached_property
+    def cell_stats(self):
+        # the partitions are the cells, and the manifest has their statistics
+        if not all("summary" in partition for partition in self.manifest.partitions):
+            return super().cell_stats
+        return {
+            (partition["year"], sum(1 << self.genres.index(genre) for genre in partition["genres"])):
+                MovieStats.from_dict(partition["summary"])
+            for partition in self.manifest.partitions
+        }
+
+    @cached_property
+    def cell_sketches(self):
+        # likewise their sketches, so the approximate mode opens no partition
+        if not all("sketch" in partition for partition in self.manifest.partitions):
+            return super().cell_sketches
+        return {
+            (partition["year"], sum(1 << self.genres.index(genre) for genre in partition["genres"])):
+                MovieSketch.from_dict(partition["sketch"])
+            for partition in self.manifest.partitions
+        }
+
+    def _table(self, part):
+        if part not in self.tables:
+            from pyarrow import feather
+
+            self.tables[part] = feather.read_table(self.manifest.path(part), memory_map=True)
+        return self.tables[part]
+
+    def _gather(self, rows, columns=None):
+        import pyarrow as pa
+
+        def select(part):
+            table = self._table(part)
+            return table if columns is None else table.select(list(columns))
+
+        if rows is None:
+            return pa.concat_tables([select(part) for part in range(len(self.manifest))])
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return select(0).slice(0, 0)
+        offsets = self.manifest.offsets
+        parts = np.searchsorted(offsets, rows, side="right") - 1
+        order = np.argsort(parts, kind="stable")
+        starts = np.flatnonzero(np.diff(parts[order], prepend=-1))
+        table = pa.concat_tables([
+            select(parts[group[0]]).take(rows[group] - offsets[parts[group[0]]])
+            for group in np.split(order, starts[1:])
+        ])
+        if (order[1:] < order[:-1]).any():
+            # back from partition order to the order of `rows`
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            table = table.take(inverse)
+        return table
+
+    def _evaluate(self, spec):
+        if spec.genres is not None and not spec.genres:
+            return np.arange(0)
+        offsets = self.manifest.offsets
+        selected = self.manifest.select(spec)
+        masks = {part: _mask(self._table(part), spec) for part in selected}
+        if spec.fuzzy and spec.title:
+            return self._fuzzy(spec.title, masks)
+        matches = [np.arange(offsets[part], offsets[part + 1]) if mask is None else np.flatnonzero(mask) + offsets[part]
+                   for part, mask in masks.items()]
+        return np.concatenate(matches) if matches else np.arange(0)
+
+    def _fuzzy(self, title, masks, limit=50):
+        """The best `limit` title matches among the rows of `masks`, ranked like TrigramIndex.fuzzy."""
+        rows, scores, sizes = [np.arange(0)], [np.zeros(0)], [np.arange(0)]
+        for part, mask in masks.items():
+            if part not in self.title_indexes:
+                from indexes import TrigramIndex
+
+                self.title_indexes[part] = TrigramIndex(self._table(part)['title'].to_pylist())
+            index = self.title_indexes[part]
+            matches, score = index.fuzzy(title, limit, candidates=mask)
+            rows.append(matches + self.manifest.offsets[part])
+            scores.append(score)
+            sizes.append(index.sizes[matches])
+        rows, scores, sizes = np.concatenate(rows), np.concatenate(scores), np.concatenate(sizes)
+        # equal scores: the shorter title is the more similar one
+        return rows[np.lexsort((rows, sizes, -scores))[:limit]]
+
+
+ENGINES = ("pandas", "arrow", "partitioned")
+
+
+def open_engine(csv_path=MOVIES_CSV, kind=None):
+    """The query engine for a movie table; `kind` defaults to $IMDB_ENGINE, then pandas."""
+    kind = kind or os.environ.get("IMDB_ENGINE", "pandas")
+    if kind == "partitioned":
+        directory = partitions_path(csv_path)
+        if not os.path.exists(os.path.join(directory, MANIFEST)):
+            raise FileNotFoundError(f"{directory} not found; write it with `python partitions.py {csv_path}`")
+        return PartitionedEngine(directory)
+    if kind == "arrow":
+        path = columnar_path(csv_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; write it with `python dataset.py columnar {csv_path}`")
+        return ArrowEngine([path])
+    if kind != "pandas":
+        raise ValueError(f"unknown engine {kind!r}, expected one of {', '.join(ENGINES)}")
+    movies = freeze(load_dataset(csv_path))
+    return MovieQuery(movies, frames_version([movies]))
+
+
+PARITY_SPECS = [
+    ALL,
+    FilterSpec.make(genres=()),
+    FilterSpec.make(genres=['Family']),
+    FilterSpec.make(genres=['Fantasy', 'Family'], genre_mode="all"),
+    FilterSpec.make(genres=['Animation', 'Adventure']),
+    FilterSpec.make(runtime=(None, 120, True, False)),
+    FilterSpec.make(runtime=(120, 180)),
+    FilterSpec.make(runtime=(180, None, False, True)),
+    FilterSpec.make(year=(2024, 2024)),
+    FilterSpec.make(genres=['Family'], year=(None, 2023)),
+    FilterSpec.make(min_score=6.7),
+    FilterSpec.make(min_votes=10_000),
+    FilterSpec.make(genres=['Family'], runtime=(None, 120, True, False), min_score=6.0, min_votes=1000),
+    FilterSpec.make(title="the"),
+    FilterSpec.make(title="a"),
+    FilterSpec.make(title="("),
+    FilterSpec.make(title="moanna", fuzzy=True),
+    FilterSpec.make(genres=['Family'], title="wild robott", fuzzy=True),
+]
+SORTS = (None, 'title', 'imdb_score', 'votes', 'runtime', 'year')
+
+
+def _same(left, right):
+    if isinstance(left, np.ndarray):
+        return np.array_equal(left, right)
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(_same(left[key], right[key]) for key in left)
+    try:
+        if isinstance(left, pd.DataFrame):
+            pd.testing.assert_frame_equal(left, right)
+        elif isinstance(left, pd.Series):
+            pd.testing.assert_series_equal(left, right)
+        else:
+            return left == right or (pd.isna(left) and pd.isna(right))
+    except AssertionError:
+        return False
+    return True
+
+
+def check_parity(engines, specs=PARITY_SPECS):
+    """Run every query through every engine; the (query, engine) pairs that differ from the first engine."""
+    from aggregates import compute_aggregates
+
+    queries = []
+    for spec in specs:
+        if spec.genres and not set(spec.genres) <= set(engines[0].genres):
+            continue  # a genre this dataset does not have
+        queries += [
+            (f"rows {spec}", lambda e, spec=spec: e.rows(spec)),
+            (f"frame {spec}", lambda e, spec=spec: e.frame(spec)),
+            (f"mean votes {spec}", lambda e, spec=spec: e.aggregate('votes', 'mean', spec)),
+            (f"max score {spec}", lambda e, spec=spec: e.aggregate('imdb_score', 'max', spec)),
+            (f"genre mean runtime {spec}", lambda e, spec=spec: e.group_by_genre('runtime', 'mean', spec)),
+            (f"summary {spec}", lambda e, spec=spec: e.summary(spec)),
+            (f"sketch {spec}", lambda e, spec=spec: e.sketch(spec).to_dict()),
+        ]
+        for sort in SORTS:
+            for descending in (False, True):
+                queries.append((f"page 2 by {sort} {'desc' if descending else 'asc'} {spec}",
+                                lambda e, spec=spec, sort=sort, d=descending: e.page(spec, 1, 10, sort, d)))
+    queries.append(("aggregates", compute_aggregates))
+
+    differences = []
+    for name, run in queries:
+        expected = run(engines[0])
+        for engine in engines[1:]:
+            if not _same(expected, run(engine)):
+                differences.append((name, type(engine).__name__))
+    return differences, len(queries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    check = sub.add_parser("check", help="run the same queries through every engine and compare")
+    check.add_argument("csv", nargs="?", default=MOVIES_CSV)
+    args = parser.parse_args(argv)
+
+    groups = [[open_engine(args.csv, kind) for kind in ("pandas", "arrow")]]
+    if os.path.exists(os.path.join(partitions_path(args.csv), MANIFEST)):
+        partitioned = open_engine(args.csv, "partitioned")
+        groups.append([ArrowEngine(partitioned.manifest.paths()), partitioned])
+    failed = False
+    for engines in groups:
+        differences, total = check_parity(engines)
+        for name, engine in differences:
+            print(f"DIFFERENT  {engine}: {name}")
+        print(f"{total} queries, {len(differences)} differences across "
+              f"{', '.join(type(engine).__name__ for engine in engines)}")
+        failed = failed or bool(differences)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Rendered-figure cache for the dashboards.
+
+A matplotlib figure is drawn once, saved to PNG and closed straight away
+(as is any figure left open by a drawing that fails);
+the PNG is kept under (figure kind, digest of the data it was drawn from),
+so a rerun with the same data shows the stored image instead of drawing
+again. Figures that do not depend on any widget pass the dataset version
+as their key and render once per dataset.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# what st.pyplot uses, so cached figures look the same
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200, "format": "png"}
+
+
+def data_digest(*parts):
+    """Short hash of the values a figure is drawn from."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series, pd.Index)):
+            digest.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+            names = part.columns if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr(list(names)).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def render(fig):
+    """PNG bytes of `fig`; the figure is always closed afterwards.
+
+    A PIL image (e.g. `WordCloud.to_image()`) is saved as it is, at its own
+    size; None (nothing to draw) is cached as None.
+    """
+    if fig is None:
+        return None
+    if not hasattr(fig, "savefig"):
+        image = io.BytesIO()
+        fig.save(image, format="PNG")
+        return image.getvalue()
+    try:
+        image = io.BytesIO()
+        fig.savefig(image, **SAVEFIG_OPTIONS)
+        return image.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class FigureCache:
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # pyplot keeps global state, so only one figure is drawn at a time
+        self.render_lock = threading.Lock()
+
+    def get(self, kind, draw, *data, key=None):
+        """PNG of the `kind` figure for `data`, drawing it with `draw(*data)` on a miss.
+
+        `key` replaces the data digest, e.g. the dataset version for figures
+        that do not depend on the filters.
+        """
+        cache_key = (kind, key if key is not None else data_digest(*data))
+        with self.lock:
+            if cache_key in self.images:
+                self.hits += 1
+                self.images.move_to_end(cache_key)
+                return self.images[cache_key]
+
+        with self.render_lock:
+            with self.lock:
+                # another session may have drawn it while we waited
+                if cache_key in self.images:
+                    self.hits += 1
+                    return self.images[cache_key]
+                self.misses += 1
+            opened = set(plt.get_fignums())
+            try:
+                image = render(draw(*data))
+            finally:
+                # figures `draw` opened but never handed over, e.g. because it raised
+                for number in set(plt.get_fignums()) - opened:
+                    plt.close(number)
+
+        with self.lock:
+            self.images[cache_key] = image
+            if len(self.images) > self.maxsize:
+                self.images.popitem(last=False)
+        return image
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.images), "maxsize": self.maxsize}
@@ -0,0 +1,339 @@
+"""In-memory indexes built once when the dashboard data loads.
+
+Each can be `extended()` with rows appended to the dataset, which gives a
+new index and leaves the old one (still in use by other sessions) alone.
+"""
+import copy
+
+import numpy as np
+
+from dataset import genre_columns
+
+
+class GenreIndex:
+    """Genre membership of every row as one bitmask.
+
+    Bit i of `masks[row]` is set when the row belongs to `genres[i]`, so a
+    genre selection is a single vectorized AND over the mask array.
+    """
+
+    def __init__(self, movies):
+        self.genres = genre_columns(movies)
+        self.bits = {genre: 1 << i for i, genre in enumerate(self.genres)}
+        self.masks = self._masks(movies)
+
+    def _masks(self, movies):
+        dtype = np.min_scalar_type((1 << max(len(self.genres), 1)) - 1)
+        masks = np.zeros(len(movies), dtype=dtype)
+        for genre, bit in self.bits.items():
+            masks |= np.where(movies[genre].to_numpy(dtype=bool), bit, 0).astype(dtype)
+        return masks
+
+    def extended(self, rows):
+        """A new index with the (same-genre) `rows` appended."""
+        index = copy.copy(self)
+        index.masks = np.concatenate([self.masks, self._masks(rows)])
+        return index
+
+    def selection_mask(self, selected):
+        mask = 0
+        for genre in selected:
+            mask |= self.bits[genre]
+        return mask
+
+    def match(self, selected, mode="any"):
+        """Boolean array of the rows in any (or all) of the `selected` genres; no selection matches every row."""
+        mask = self.masks.dtype.type(self.selection_mask(selected))
+        if not mask:
+            return np.ones(len(self.masks), dtype=bool)
+        hits = self.masks & mask
+        return hits == mask if mode == "all" else hits != 0
+
+
+class SortedIndex:
+    """Argsort permutation of one numeric column.
+
+    Top-k / bottom-k are slices of the permutation and range predicates are
+    two binary searches; NaN values sort last and never match.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        self.order = np.argsort(values, kind="stable")
+        self.sorted = values[self.order]
+        self.valid = len(values) - int(np.isnan(self.sorted).sum()) if values.dtype.kind == "f" else len(values)
+        self._descending = None
+
+    def __len__(self):
+        return len(self.order)
+
+    def extended(self, values):
+        """A new index with `values` appended as the next rows, merged in without sorting the old ones again."""
+        values = np.asarray(values)
+        order = np.argsort(values, kind="stable")
+        tail = values[order]
+        valid = len(values) - int(np.isnan(tail).sum()) if values.dtype.kind == "f" else len(values)
+        # after the old values that are equal (their rows come first); missing values at the very end
+        at = np.append(np.searchsorted(self.sorted[:self.valid], tail[:valid], side="right"),
+                       np.full(len(values) - valid, len(self.order)))
+        index = SortedIndex.__new__(SortedIndex)
+        index.order = np.insert(self.order, at, order + len(self.order))
+        index.sorted = np.insert(self.sorted, at, tail)
+        index.valid = self.valid + valid
+        index._descending = None
+        return index
+
+    def top(self, k):
+        """Positions of the k largest values, largest first."""
+        return self.order[max(self.valid - k, 0):self.valid][::-1]
+
+    def bottom(self, k):
+        """Positions of the k smallest values, smallest first."""
+        return self.order[:min(k, self.valid)]
+
+    def bounds(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=True):
+        """Slice [start, stop) of the permutation whose values lie in the given range."""
+        values = self.sorted[:self.valid]
+        if values.dtype.kind == "f":
+            # compare in the column's precision, e.g. float32 6.7 >= 6.7
+            lo = None if lo is None else values.dtype.type(lo)
+            hi = None if hi is None else values.dtype.type(hi)
+        start = 0 if lo is None else np.searchsorted(values, lo, side="left" if lo_inclusive else "right")
+        stop = self.valid if hi is None else np.searchsorted(values, hi, side="right" if hi_inclusive else "left")
+        return int(start), max(int(stop), int(start))
+
+    def range(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=True):
+        """Positions (in index order, not row order) of the values in the range."""
+        start, stop = self.bounds(lo, hi, lo_inclusive, hi_inclusive)
+        return self.order[start:stop]
+
+    def ordered(self, descending=False):
+        """Every position by value, missing values last and equal values in row order."""
+        if not descending:
+            return self.order
+        if self._descending is None:
+            # reverse the runs of equal values, keeping each run's own order
+            valid = self.valid
+            new_run = np.append(True, self.sorted[1:valid] != self.sorted[:valid - 1])[:valid]
+            run = np.cumsum(new_run) - 1
+            starts = np.flatnonzero(new_run)
+            ends = np.append(starts[1:], valid)
+            offset = np.arange(valid) - starts[run]
+            descending = np.empty_like(self.order)
+            descending[valid - ends[run] + offset] = self.order[:valid]
+            descending[valid:] = self.order[valid:]
+            self._descending = descending
+        return self._descending
+
+
+class ColumnIndexes:
+    """SortedIndex per numeric column, answering conjunctions of range predicates."""
+
+    def __init__(self, df, columns=("votes", "imdb_score", "runtime", "year")):
+        self.size = len(df)
+        columns = [column for column in columns if column in df]
+        self.values = {column: df[column].to_numpy() for column in columns}
+        self.indexes = {column: SortedIndex(self.values[column]) for column in columns}
+
+    def __getitem__(self, column):
+        return self.indexes[column]
+
+    def extended(self, rows):
+        """New indexes with `rows` appended."""
+        index = copy.copy(self)
+        index.size = self.size + len(rows)
+        index.values = {column: np.concatenate([values, rows[column].to_numpy()]) for column, values in self.values.items()}
+        index.indexes = {column: self.indexes[column].extended(rows[column].to_numpy()) for column in self.indexes}
+        return index
+
+    def select(self, predicates):
+        """Row positions (ascending) matching every predicate.
+
+        `predicates` maps a column to (lo, hi) or (lo, hi, lo_inclusive,
+        hi_inclusive); None leaves that side open. The most selective
+        predicate is answered from its index and the remaining ones are
+        checked only against those candidate rows. Predicates that match
+        every row are skipped; no predicates at all returns None (all rows).
+        """
+        slices = []
+        for column, bounds in predicates.items():
+            index = self.indexes[column]
+            start, stop = index.bounds(*bounds)
+            if stop - start < self.size:
+                slices.append((stop - start, column, bounds, start, stop))
+        if not slices:
+            return None
+
+        slices.sort(key=lambda item: item[0])
+        _, column, _, start, stop = slices[0]
+        candidates = self.indexes[column].order[start:stop]
+        if len(candidates) > self.size // 16:
+            # large slices: scattering into a mask beats sorting the positions
+            keep = np.zeros(self.size, dtype=bool)
+            keep[candidates] = True
+            rows = np.flatnonzero(keep)
+        else:
+            rows = np.sort(candidates)
+        for _, column, bounds, _, _ in slices[1:]:
+            rows = rows[self._in_range(self.values[column][rows], *bounds)]
+        return rows
+
+    @staticmethod
+    def _in_range(values, lo=None, hi=None, lo_inclusive=True, hi_inclusive=True):
+        keep = np.ones(len(values), dtype=bool)
+        if lo is not None:
+            keep &= values >= lo if lo_inclusive else values > lo
+        if hi is not None:
+            keep &= values <= hi if hi_inclusive else values < hi
+        return keep
+
+
+class TrigramIndex:
+    """Inverted index from character trigrams to the titles containing them.
+
+    Titles are lowercased and indexed with a space in front and two behind,
+    so word starts and ends have their own trigrams and every character
+    starts one. A substring query intersects the posting lists of its
+    trigrams and checks the few candidates left literally; one or two
+    characters are answered from the trigrams they start. A fuzzy query
+    ranks titles by how many of the query's trigrams they share, which
+    tolerates typos.
+    """
+
+    def __init__(self, titles):
+        self.titles = np.array([str(title).lower() for title in titles], dtype=object)
+        padded = [f" {title}  " for title in self.titles]
+        lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+
+        # every padded title in one code point array, "\0" between titles
+        chars = np.frombuffer("\0".join(padded).encode("utf-32-le"), dtype=np.uint32)
+        owner = np.repeat(np.arange(len(padded)), lengths + 1)[:len(chars) - 2]
+        valid = (chars[:-2] != 0) & (chars[1:-1] != 0) & (chars[2:] != 0)
+        keys, owner = self._keys(chars.astype(np.uint64))[valid], owner[valid]
+
+        # posting lists: rows sorted within each trigram, each (trigram, row) once
+        alphabet = np.flatnonzero(np.bincount(chars))
+        if 0 < len(alphabet) ** 3 <= 2 ** 32:
+            # numbered over the titles' own alphabet the trigrams fit 32 bits,
+            # so two 16-bit radix passes replace a comparison sort
+            dense = np.zeros(alphabet[-1] + 1, dtype=np.int64)
+            dense[alphabet] = np.arange(len(alphabet))
+            dense = dense[chars]
+            ids = ((dense[:-2] * len(alphabet) + dense[1:-1]) * len(alphabet) + dense[2:])[valid]
+            order = np.argsort((ids & 0xFFFF).astype(np.uint16), kind="stable")
+            order = order[np.argsort((ids[order] >> 16).astype(np.uint16), kind="stable")]
+        else:
+            order = np.argsort(keys, kind="stable")
+        keys, owner = keys[order], owner[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (owner[1:] != owner[:-1])
+        keys, self.postings = keys[first], owner[first]
+
+        starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1])[:len(keys)])
+        self.keys = keys[starts]
+        self.offsets = np.append(starts, len(keys))
+        self.sizes = np.bincount(self.postings, minlength=len(padded))
+
+    def extended(self, titles):
+        """A new index with `titles` appended as the next rows.
+
+        Only the new titles are split into trigrams; their posting lists are
+        merged behind the old ones, which stay sorted since the new rows
+        come last.
+        """
+        tail = TrigramIndex(titles)
+        keys = np.concatenate([self.keys, tail.keys])
+        keys.sort()
+        keys = keys[np.append(True, keys[1:] != keys[:-1])[:len(keys)]]
+        old = np.searchsorted(keys, self.keys)
+        new = np.searchsorted(keys, tail.keys)
+        old_counts = np.zeros(len(keys), dtype=np.int64)
+        old_counts[old] = np.diff(self.offsets)
+        counts = old_counts.copy()
+        counts[new] += np.diff(tail.offsets)
+        offsets = np.append(0, np.cumsum(counts))
+
+        def destinations(index, slots, start):
+            # where each posting of `index` goes: its list's new start plus its place in the list
+            sizes = np.diff(index.offsets)
+            return np.repeat(start[slots] - index.offsets[:-1], sizes) + np.arange(len(index.postings))
+
+        postings = np.empty(offsets[-1], dtype=self.postings.dtype)
+        postings[destinations(self, old, offsets)] = self.postings
+        postings[destinations(tail, new, offsets[:-1] + old_counts)] = tail.postings + len(self.titles)
+
+        index = TrigramIndex.__new__(TrigramIndex)
+        index.titles = np.concatenate([self.titles, tail.titles])
+        index.keys, index.offsets, index.postings = keys, offsets, postings
+        index.sizes = np.concatenate([self.sizes, tail.sizes])
+        return index
+
+    @staticmethod
+    def _keys(chars):
+        # three 21-bit code points packed into one integer
+        return (chars[:-2] << np.uint64(42)) | (chars[1:-1] << np.uint64(21)) | chars[2:]
+
+    def _grams(self, text):
+        chars = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        return np.unique(self._keys(chars)) if len(chars) >= 3 else chars[:0]
+
+    def posting(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.postings[:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def search(self, query):
+        """Rows (ascending) whose title contains `query`, case-insensitively and literally."""
+        query = query.lower()
+        if len(query) < 3:
+            candidates = self._prefixed(query)
+        else:
+            postings = sorted((self.posting(key) for key in self._grams(query)), key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not len(candidates):
+                    break
+                at = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+                candidates = candidates[posting[at] == candidates]
+        if len(query) <= 3 and query == query.strip():
+            # a single trigram or a prefix of one: the postings are exact
+            return candidates
+        found = np.fromiter((query in title for title in self.titles[candidates]), dtype=bool, count=len(candidates))
+        return candidates[found]
+
+    def _prefixed(self, query):
+        """Rows with a trigram starting with the one or two characters of `query`.
+
+        Titles end in two spaces, so each of their characters starts a trigram.
+        """
+        if not query:
+            return np.arange(len(self.titles))
+        chars = [ord(char) for char in query]
+        shift = 42 if len(chars) == 1 else 21
+        lo = np.uint64(sum(char << (42 - 21 * i) for i, char in enumerate(chars)))
+        start, stop = np.searchsorted(self.keys, [lo, lo + np.uint64(1 << shift)])
+        keep = np.zeros(len(self.titles), dtype=bool)
+        keep[self.postings[self.offsets[start]:self.offsets[stop]]] = True
+        return np.flatnonzero(keep)
+
+    def fuzzy(self, query, limit=50, threshold=0.5, candidates=None):
+        """Rows of the titles most similar to `query`, best first, and their scores.
+
+        The score is the share of the query's trigrams (word starts and ends
+        included) found in the title; ties go to the shorter title. Only the
+        rows set in `candidates` (a boolean array, None for all rows) are
+        ranked, so the other filters of a query apply before the `limit` cut.
+        """
+        grams = self._grams(f" {query.lower()}  ")
+        if not len(grams):
+            return self.postings[:0], np.zeros(0)
+        rows, shared = np.unique(np.concatenate([self.posting(key) for key in grams]), return_counts=True)
+        score = shared / len(grams)
+        keep = score >= threshold
+        if candidates is not None:
+            keep &= candidates[rows]
+        rows, shared, score = rows[keep], shared[keep], score[keep]
+        similarity = shared / (len(grams) + self.sizes[rows] - shared)
+        best = np.lexsort((rows, -similarity, -score))[:limit]
+        return rows[best], score[best]
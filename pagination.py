@@ -0,0 +1,103 @@
+"""Drive the "X more" button of an IMDb search page until every result is loaded.
+
+Instead of sleeping a fixed 5 s after each click, the controller reads the
+total result count from the page ("1-50 of 1,234"), clicks "more" and waits
+only until the number of list items grows. It stops as soon as every result
+is on the page, the button disappears, the list stops growing, or the
+configured page cap is reached.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+COUNT_JS = """
+return document.evaluate(arguments[0], document, null,
+                         XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+"""
+
+TOTAL_JS = r"""
+const match = document.body.innerText.match(/\d[\d,]*\s*-\s*\d[\d,]*\s+of\s+(\d[\d,]*)/);
+return match ? parseInt(match[1].replace(/,/g, ''), 10) : null;
+"""
+
+CLICK_MORE_JS = r"""
+const snapshot = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < snapshot.snapshotLength; i++) {
+  const button = snapshot.snapshotItem(i);
+  if (/\d+/.test(button.textContent)) {
+    button.click();
+    return true;
+  }
+}
+return false;
+"""
+
+
+@dataclass
+class PageLoad:
+    page: int
+    items: int
+    seconds: float
+
+
+class LoadMoreController:
+    def __init__(self, driver, list_xpath, more_xpath, max_clicks=None, timeout=15, poll=0.1):
+        self.driver = driver
+        self.list_xpath = list_xpath
+        self.more_xpath = more_xpath
+        self.max_clicks = max_clicks
+        self.timeout = timeout
+        self.poll = poll
+        self.pages = []
+
+    def item_count(self):
+        return self.driver.execute_script(COUNT_JS, self.list_xpath)
+
+    def total_results(self):
+        return self.driver.execute_script(TOTAL_JS)
+
+    def wait_for_more_than(self, count):
+        """Wait until the list has more than `count` items; return the new count or None on timeout."""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            return WebDriverWait(self.driver, self.timeout, poll_frequency=self.poll).until(
+                lambda driver: (n := self.item_count()) > count and n
+            )
+        except TimeoutException:
+            return None
+
+    def load_all(self):
+        """Load every result page and return the per-page timings."""
+        start = time.perf_counter()
+        count = self.wait_for_more_than(0) or 0
+        total = self.total_results()
+        self._record(count, start)
+
+        while True:
+            if total is not None and count >= total:
+                break
+            if self.max_clicks is not None and len(self.pages) > self.max_clicks:
+                log.info("stopping after %d clicks with %d of %s results", self.max_clicks, count, total)
+                break
+            start = time.perf_counter()
+            if not self.driver.execute_script(CLICK_MORE_JS, self.more_xpath):
+                break
+            new_count = self.wait_for_more_than(count)
+            if new_count is None:
+                log.warning("list stopped growing at %d of %s results", count, total)
+                break
+            count = new_count
+            self._record(count, start)
+
+        if total is not None and count < total:
+            log.warning("loaded %d of %d results", count, total)
+        return self.pages
+
+    def _record(self, count, start):
+        page = PageLoad(len(self.pages) + 1, count, time.perf_counter() - start)
+        self.pages.append(page)
+        log.info("page %d: %d items in %.2fs", page.page, page.items, page.seconds)
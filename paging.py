@@ -0,0 +1,42 @@
+"""Paged, sortable result table shared by both dashboards.
+
+Only the rows of the page on screen are taken from the dataset and sent
+to the browser, whatever the filter matched; the total comes from the
+engine's row count.
+"""
+import math
+
+import streamlit as st
+
+from query import PAGE_SIZE
+
+SORT_COLUMNS = {
+    "Default order": None,
+    "Title": "title",
+    "IMDb score": "imdb_score",
+    "Votes": "votes",
+    "Runtime": "runtime",
+    "Release year": "year",
+}
+
+
+def paged_table(engine, spec, columns, key, page_size=PAGE_SIZE):
+    """Sort and page controls plus one page of the rows matching `spec`; returns the total."""
+    total = engine.count(spec)
+    pages = max(math.ceil(total / page_size), 1)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        # the filter now matches fewer pages than the one being shown
+        st.session_state[page_key] = 1
+
+    sort_col, order_col, page_col = st.columns([2, 1, 1])
+    sort = sort_col.selectbox("Sort by", list(SORT_COLUMNS), key=f"{key}_sort")
+    descending = order_col.toggle("Descending", value=True, key=f"{key}_descending",
+                                  disabled=SORT_COLUMNS[sort] is None)
+    page = page_col.number_input("Page", min_value=1, max_value=pages, key=page_key)
+
+    rows = engine.page(spec, page - 1, page_size, SORT_COLUMNS[sort], descending, columns)
+    st.dataframe(rows, hide_index=True)
+    start = (page - 1) * page_size
+    st.caption(f"Rows {min(start + 1, total):,}–{start + len(rows):,} of {total:,} (page {page:,} of {pages:,})")
+    return total
@@ -0,0 +1,176 @@
+"""Movie table partitioned by release year and genre set.
+
+    movies_partitions/
+        manifest.json
+        <version>/2024/Fantasy+Family.feather
+        <version>/2024/Animation+Adventure+Family.feather
+        ...
+
+Every movie is stored once, in the partition of its release year and its
+exact set of genres, so a genre filter keeps the partitions whose genre set
+matches (any or all of the selected genres) and nothing has to be
+deduplicated across partitions. The manifest lists the partitions with
+their row count, the min/max of every numeric column, their running
+statistics (see running_stats.py) and sketches (see sketches.py);
+`Manifest.select` drops the partitions that cannot hold a matching row
+before any file is opened (see engines.PartitionedEngine), so reading one
+year and genre costs the same however many years the archive holds.
+
+Every version of the archive is written under its own directory, named by
+the manifest version, and the manifest is swapped in last. A reader
+therefore never sees a half-written archive, and an engine opened on an
+older manifest never reads a newer partition file with its older row
+offsets. The files of the version just replaced are kept, so an engine
+still on it keeps answering until it is reopened (see reloading.py); only
+versions older than that are deleted.
+
+    python partitions.py movies.csv     # write movies_partitions/
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from dataset import DTYPES, MOVIES_CSV, compact, frames_version, genre_columns, load_dataset, write_atomic, write_columnar
+from query import bounds_cover
+from running_stats import MovieStats
+from sketches import MovieSketch
+
+MANIFEST = "manifest.json"
+STATS_COLUMNS = ("year", "runtime", "imdb_score", "votes")
+NO_GENRE = "none"
+
+
+def partitions_path(csv_path):
+    return os.path.splitext(csv_path)[0] + "_partitions"
+
+
+def partition_name(year, genres):
+    """'2024/Fantasy+Family.feather'."""
+    return f"{year}/{'+'.join(genres) or NO_GENRE}.feather"
+
+
+def _stats(part):
+    """[min, max] of each numeric column, None when it has no values."""
+    stats = {}
+    for column in STATS_COLUMNS:
+        values = part[column].dropna()
+        stats[column] = [values.min().item(), values.max().item()] if len(values) else None
+    return stats
+
+
+def write_partitions(movies, directory):
+    """Write the normalized movie table as a new version of partitions plus manifest; returns the manifest."""
+    movies = compact(movies)
+    genres = genre_columns(movies)
+    # the genre set of every row as a bitmask, bit i for genres[i]
+    masks = movies[genres].to_numpy().astype(np.int64) @ (1 << np.arange(len(genres), dtype=np.int64))
+    groups = movies.groupby([movies['year'].to_numpy(), masks]).indices
+
+    try:
+        previous = Manifest(directory).paths()
+    except (OSError, ValueError, KeyError):
+        previous = []
+    keys = sorted(groups)
+    parts = [movies.iloc[groups[key]].reset_index(drop=True) for key in keys]
+    # the version of the partitions read one after the other, as engines.PartitionedEngine does
+    version = frames_version(parts)
+
+    partitions = []
+    for (year, mask), part in zip(keys, parts):
+        members = [genre for i, genre in enumerate(genres) if mask >> i & 1]
+        name = f"{version}/{partition_name(year, members)}"
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_columnar(part, path)
+        partitions.append({"path": name, "year": int(year), "genres": members, "rows": len(part),
+                           "stats": _stats(part), "summary": MovieStats.of(part).to_dict(),
+                           "sketch": MovieSketch.of(part).to_dict()})
+
+    manifest = {
+        "version": version,
+        "genres": genres,
+        "partitions": partitions,
+    }
+
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    write_atomic(write_manifest, os.path.join(directory, MANIFEST))
+
+    # the partitions of versions before the one replaced, and their emptied directories
+    kept = {os.path.normpath(os.path.join(directory, partition["path"])) for partition in partitions}
+    kept.update(os.path.normpath(path) for path in previous)
+    for root, dirs, files in os.walk(directory, topdown=False):
+        for file in files:
+            path = os.path.normpath(os.path.join(root, file))
+            if file.endswith(".feather") and path not in kept:
+                os.remove(path)
+        for name in dirs:
+            path = os.path.join(root, name)
+            if not os.listdir(path):
+                os.rmdir(path)
+    return manifest
+
+
+class Manifest:
+    """The partitions of an archive, and which of them a FilterSpec can match."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.directory = directory
+        self.version = manifest["version"]
+        self.genres = manifest["genres"]
+        self.partitions = manifest["partitions"]
+        # first row position of each partition, and the total at the end
+        self.offsets = np.cumsum([0] + [partition["rows"] for partition in self.partitions])
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def path(self, part):
+        return os.path.join(self.directory, self.partitions[part]["path"])
+
+    def paths(self):
+        return [self.path(part) for part in range(len(self))]
+
+    def select(self, spec):
+        """Positions of the partitions that may hold rows matching `spec`, in manifest order."""
+        return [part for part, partition in enumerate(self.partitions) if self._may_match(partition, spec)]
+
+    @staticmethod
+    def _may_match(partition, spec):
+        if spec.genres is not None:
+            selected = set(spec.genres)
+            members = selected & set(partition["genres"])
+            if not members or (spec.genre_mode == "all" and members != selected):
+                return False
+        for column, bounds in spec.predicates().items():
+            if column not in partition["stats"]:
+                continue
+            stats = partition["stats"][column]
+            if stats is None:
+                return False  # only missing values, which never match
+            some, _ = bounds_cover(bounds, stats[0], stats[1], np.dtype(DTYPES[column]))
+            if not some:
+                return False
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the movie table partitioned by year and genre set.")
+    parser.add_argument("csv", nargs="?", default=MOVIES_CSV)
+    parser.add_argument("--out", help="archive directory (default: next to the CSV)")
+    args = parser.parse_args(argv)
+
+    directory = args.out or partitions_path(args.csv)
+    manifest = write_partitions(load_dataset(args.csv), directory)
+    rows = sum(partition["rows"] for partition in manifest["partitions"])
+    print(f"{args.csv} -> {directory} ({rows:,} movies in {len(manifest['partitions'])} partitions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Offline cleaning pipeline: raw scrape CSVs -> merged_movies_sorted.csv.
+
+Replaces the TiDB + Colab round trip. Every raw `<Genre>_IMDb<year>_list.csv`
+is read and cleaned in its own worker process, tagged with the genre and
+release year from its name; the results are merged, rows without a rating
+are dropped (as in the TiDB tables), and the frame is sorted by title and
+written out, together with its columnar copy and the deduplicated
+one-row-per-movie table (see dataset.py), that table partitioned by year
+and genre (see partitions.py) and the dashboard aggregates for it (see
+aggregates.py).
+
+An existing output that holds genres the raw files do not have is left
+alone (the committed dataset has four genres, the raw lists in the tree
+only two) unless `--force` is given.
+
+    python pipeline.py
+    python pipeline.py --raw "data/*_IMDb*_list.csv" --out merged_movies_sorted.csv --workers 4
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from aggregates import aggregates_path, write_aggregates
+from cleaning import COLUMNS, clean_frame
+from dataset import MOVIES_CSV, columnar_path, write_columnar, write_movies
+from partitions import partitions_path, write_partitions
+
+RAW_PATTERN = "*_IMDb*_list.csv"
+# Same concatenation order as the notebook; the title sort is stable, so movies
+# listed under several genres keep this genre order
+GENRE_ORDER = ['Fantasy', 'Animation', 'Adventure', 'Family']
+
+
+def genre_of(path):
+    """'Fantasy_IMDb2024_list.csv' -> 'Fantasy'."""
+    return os.path.basename(path).split("_IMDb")[0]
+
+
+def year_of(path):
+    """'Fantasy_IMDb2024_list.csv' -> 2024."""
+    return int(re.search(r"_IMDb(\d{4})", os.path.basename(path)).group(1))
+
+
+def genre_sort_key(path):
+    genre = genre_of(path)
+    order = (GENRE_ORDER.index(genre), "") if genre in GENRE_ORDER else (len(GENRE_ORDER), genre)
+    return (year_of(path),) + order
+
+
+def clean_file(path):
+    """Worker: read and clean one raw CSV; returns (frame, {stage: seconds})."""
+    start = time.perf_counter()
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    read = time.perf_counter()
+    df = clean_frame(raw, genre_of(path)).assign(year=year_of(path))
+    return df, {"read": read - start, "clean": time.perf_counter() - read}
+
+
+def merge(frames):
+    merged = pd.concat(frames, ignore_index=True)
+    return merged[merged['imdb_score'] > 0].reset_index(drop=True)
+
+
+def write(df, path):
+    # "%g" writes 6.0 as 6 and CRLF matches the committed merged CSVs
+    df.to_csv(path, index=False, float_format="%g", lineterminator="\r\n")
+
+
+def existing_genres(merged_path, movies_path):
+    """Genres in the merged CSV and movie table already written there; empty for missing files."""
+    genres = set()
+    if os.path.exists(merged_path):
+        genres |= set(pd.read_csv(merged_path, usecols=['genre'])['genre'].dropna())
+    if os.path.exists(movies_path):
+        header = pd.read_csv(movies_path, nrows=0).columns
+        genres |= set(header) - set(COLUMNS + ['year'])
+    return genres
+
+
+def run(paths, out, workers=None, movies_out=MOVIES_CSV, report=print, force=False):
+    """Clean `paths` in parallel; write the merged, sorted dataset to `out` and the movie table to `movies_out`.
+
+    Raises FileExistsError instead of replacing outputs that have genres
+    missing from `paths`, unless `force`.
+    """
+    paths = sorted(paths, key=genre_sort_key)
+    if not paths:
+        raise FileNotFoundError("no raw scrape files to clean")
+    missing = existing_genres(out, movies_out) - {genre_of(path) for path in paths}
+    if missing and not force:
+        raise FileExistsError(f"{out} / {movies_out} have genres without raw files ({', '.join(sorted(missing))}); "
+                              "pass --force to replace them")
+
+    timings = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(clean_file, paths))
+    timings["read + clean (wall)"] = time.perf_counter() - start
+    for path, (df, stages) in zip(paths, results):
+        report(f"  {os.path.basename(path):<32} {len(df):>8,} rows  "
+               f"read {stages['read']:.3f}s  clean {stages['clean']:.3f}s")
+
+    stage = time.perf_counter()
+    merged = merge([df for df, _ in results])
+    timings["merge"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    merged = merged.sort_values('title', kind='stable')[COLUMNS + ['year']]
+    timings["sort"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    # the merged CSV keeps its columns; the year goes only into the movie table and partitions
+    write(merged[COLUMNS], out)
+    timings["write"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    try:
+        write_columnar(merged[COLUMNS], columnar_path(out))
+        timings["write columnar"] = time.perf_counter() - stage
+    except ImportError:
+        report("pyarrow is not installed; skipping the columnar copy")
+
+    stage = time.perf_counter()
+    movies = write_movies(merged, movies_out)
+    timings["normalize + write"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    aliases = []
+    try:
+        # the partitioned engine opens the archive under its own version
+        aliases.append(write_partitions(movies, partitions_path(movies_out))["version"])
+        timings["partitions"] = time.perf_counter() - stage
+    except ImportError:
+        report("pyarrow is not installed; skipping the partitions")
+
+    stage = time.perf_counter()
+    write_aggregates(movies, aggregates_path(movies_out), aliases=aliases)
+    timings["aggregates"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - start
+
+    for name, seconds in timings.items():
+        report(f"{name:<20} {seconds:8.3f}s")
+    report(f"{len(merged):,} rows written to {out}, {len(movies):,} movies to {movies_out}")
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the raw scrape CSVs into the merged dataset.")
+    parser.add_argument("--raw", default=RAW_PATTERN, help="glob of raw scrape CSVs")
+    parser.add_argument("--out", default="merged_movies_sorted.csv")
+    parser.add_argument("--movies-out", default=MOVIES_CSV, help="one-row-per-movie table")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="replace outputs that have genres the raw files lack")
+    args = parser.parse_args(argv)
+    try:
+        run(glob.glob(args.raw), args.out, args.workers, args.movies_out, force=args.force)
+    except (FileNotFoundError, FileExistsError) as exc:
+        parser.error(str(exc))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Shared filter query for both dashboards, with an LRU cache of results.
+
+Widget values are turned into a normalized FilterSpec (sorted genres,
+rounded rating, lowercased title, no-op bounds dropped), so equivalent
+selections share one cache entry. A MovieQuery answers a spec with the
+matching row positions and keeps the most recent `maxsize` answers; it is
+built per dataset version, so a changed dataset never serves stale rows.
+The title filter is a literal, case-insensitive substring match answered
+by a trigram index, or with `fuzzy` a typo-tolerant match ranked by
+similarity among the movies passing the other filters.
+
+Result tables are served a page at a time: `page()` orders the matching
+rows by a sort column through that column's sorted index and takes only
+the rows of the requested page, and `count()` reads the total off the
+row array without building a frame.
+
+QueryEngine holds everything that is built on the matching row positions
+(paging, top-k, group-by, aggregates); MovieQuery is the in-memory pandas
+engine and engines.ArrowEngine the one over memory-mapped columnar files.
+`summary()` answers the Key Metrics from running statistics kept per
+(year, genre set) cell (see running_stats.py), and `sketch()` the
+distribution charts of the approximate mode from sketches kept per cell
+(see sketches.py); both touch rows only for filters that split a cell.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from dataset import DTYPES, append_rows, freeze
+from indexes import ColumnIndexes, GenreIndex, SortedIndex, TrigramIndex
+from running_stats import STATS_COLUMNS, MovieStats, cell_stats, merge_cells
+from sketches import SKETCH_COLUMNS, MovieSketch, cell_sketches
+
+PAGE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    genres: tuple = None  # None: no genre filter; (): matches nothing
+    genre_mode: str = "any"
+    runtime: tuple = (None, None, True, True)
+    year: tuple = (None, None)
+    min_score: float = None
+    min_votes: int = None
+    title: str = ""
+    fuzzy: bool = False
+
+    @classmethod
+    def make(cls, genres=None, genre_mode="any", runtime=(None, None), min_score=None, min_votes=None, title="",
+             fuzzy=False, year=(None, None)):
+        """Build a spec from raw widget values; `year` is an inclusive range of release years."""
+        lo, hi, *inclusive = tuple(runtime) + (True, True)
+        first, last = year
+        return cls(
+            genres=None if genres is None else tuple(sorted(set(genres))),
+            genre_mode="all" if genre_mode == "all" and genres and len(set(genres)) > 1 else "any",
+            runtime=(lo, hi, *inclusive[:2]),
+            year=(None if first is None else int(first), None if last is None else int(last)),
+            min_score=None if min_score is None else round(float(min_score), 1),
+            min_votes=int(min_votes) if min_votes else None,
+            title=(title or "").strip().lower(),
+            fuzzy=bool(fuzzy and (title or "").strip()),
+        )
+
+    def predicates(self):
+        predicates = {}
+        if self.runtime[:2] != (None, None):
+            predicates['runtime'] = self.runtime
+        if self.year != (None, None):
+            predicates['year'] = self.year
+        if self.min_score is not None:
+            predicates['imdb_score'] = (self.min_score, None)
+        if self.min_votes is not None:
+            predicates['votes'] = (self.min_votes, None)
+        return predicates
+
+
+ALL = FilterSpec()
+
+
+def bounds_cover(bounds, low, high, dtype):
+    """(some, every): whether some / every value in [low, high] can pass the range predicate `bounds`."""
+    lo, hi, lo_inclusive, hi_inclusive = (tuple(bounds) + (True, True))[:4]
+    # compare in the column's precision, like SortedIndex.bounds
+    cast = dtype.type if dtype.kind == "f" else float
+
+    def above(value):
+        return lo is None or (value >= cast(lo) if lo_inclusive else value > cast(lo))
+
+    def below(value):
+        return hi is None or (value <= cast(hi) if hi_inclusive else value < cast(hi))
+
+    low, high = cast(low), cast(high)
+    return above(high) and below(low), above(low) and below(high)
+
+
+class ResultCache:
+    """LRU of read-only row arrays, shared by every session of the process."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        rows = compute(key)
+        rows.flags.writeable = False
+        with self.lock:
+            self.entries[key] = rows
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+def _aggregate(values, how):
+    # through pandas, so every engine rounds exactly like the pandas path
+    return len(values) if how == "count" else getattr(pd.Series(values), how)()
+
+
+class QueryEngine:
+    """Filtering, sorting, top-k and group-by over the movie table.
+
+    An engine answers `_evaluate(spec)` (matching row positions),
+    `_sort(spec, column, descending)`, `column(name, rows)` and
+    `take(rows, columns)`; the rest is built on those here, so every engine
+    gives the same answers.
+    """
+
+    genres = []
+
+    def __init__(self, version=None, maxsize=128):
+        self.version = version
+        self.cache = ResultCache(maxsize)
+
+    def rows(self, spec=ALL):
+        """Read-only array of the row positions matching `spec`.
+
+        Rows come in row order, or best match first for a fuzzy title search.
+        """
+        return self.cache.get(spec, self._evaluate)
+
+    def count(self, spec=ALL):
+        return len(self.rows(spec))
+
+    def sorted_rows(self, spec=ALL, sort=None, descending=False):
+        """The rows matching `spec` ordered by the `sort` column (None keeps the `rows()` order).
+
+        Missing values sort last either way; ties keep row order.
+        """
+        if sort is None:
+            return self.rows(spec)
+        return self.cache.get((spec, sort, descending), lambda key: self._sort(*key))
+
+    def frame(self, spec=ALL, columns=None):
+        return self.take(self.rows(spec), columns)
+
+    def page(self, spec=ALL, page=0, page_size=PAGE_SIZE, sort=None, descending=False, columns=None):
+        """One page of the matching rows as a frame; only those rows are taken from the dataset."""
+        rows = self.sorted_rows(spec, sort, descending)
+        start = page * page_size
+        return self.take(rows[start:start + page_size], columns)
+
+    def top_k(self, column, k, columns=None, spec=ALL, largest=True):
+        """The `k` rows with the largest (or smallest) `column`, ties in row order."""
+        return self.take(self.sorted_rows(spec, column, largest)[:k], columns)
+
+    def aggregate(self, column, how="mean", spec=ALL):
+        """count, sum, mean, min or max of `column` over the matching rows."""
+        return _aggregate(self.column(column, self.rows(spec)), how)
+
+    def bounds(self, column, spec=ALL):
+        """(min, max) of `column` over the matching movies; (None, None) when none has a value.
+
+        Answered from the cell statistics when `spec` covers whole cells, as
+        the slider ranges of the dashboards are, so no row is read.
+        """
+        if column == 'year' or column in STATS_COLUMNS:
+            covered = self._covered_cells(spec)
+            if covered is not None:
+                if column == 'year':
+                    years = [key[0] for key in covered if self.cell_stats[key].rows]
+                    return (min(years), max(years)) if years else (None, None)
+                stats = self.summary(spec)[column]
+                return stats.min, stats.max
+        values = self.column(column, self.rows(spec))
+        if not len(values) or (values.dtype.kind == "f" and np.isnan(values).all()):
+            return None, None
+        return _aggregate(values, 'min'), _aggregate(values, 'max')
+
+    def group_by_genre(self, column, how="mean", spec=ALL, genres=None):
+        """`how` of `column` per genre, a movie counting once in each of its genres.
+
+        Genres without a matching movie are left out, as with `observed=True`.
+        """
+        rows = self.rows(spec)
+        genres = genres or self.genres
+        members, positions = np.nonzero(np.column_stack([self.column(genre, rows) for genre in genres]))
+        codes = np.array([self.genres.index(genre) for genre in genres])[positions]
+        values = pd.Series(self.column(column, rows)[members], name="count" if how == "count" else column)
+        groups = values.groupby(pd.Series(pd.Categorical.from_codes(codes, self.genres), name="genre"), observed=True)
+        return getattr(groups, how)()
+
+    @cached_property
+    def cell_stats(self):
+        """MovieStats per (year, genre bitmask) cell, bit i for genres[i]; computed once."""
+        return cell_stats(self.frame(columns=['year', *self.genres, *STATS_COLUMNS]), self.genres)
+
+    def summary(self, spec=ALL):
+        """MovieStats (count, sum, mean, variance, min/max, correlation) of the movies matching `spec`.
+
+        Genre and year filters, and range filters that every movie of a cell
+        passes or fails, are answered by merging the cells' statistics; a
+        filter that splits a cell (or a title search) takes one pass over
+        the matching rows.
+        """
+        covered = self._covered_cells(spec)
+        if covered is None:
+            return MovieStats.of(self.frame(spec, STATS_COLUMNS))
+        total = MovieStats()
+        for key in covered:
+            total = total.merge(self.cell_stats[key])
+        return total
+
+    @cached_property
+    def cell_sketches(self):
+        """MovieSketch per (year, genre bitmask) cell; computed once, on the first approximate query."""
+        return cell_sketches(self.frame(columns=['year', *self.genres, 'title', *SKETCH_COLUMNS]), self.genres)
+
+    def sketch(self, spec=ALL):
+        """MovieSketch (quantiles, score histogram, distinct titles) of the movies matching `spec`.
+
+        Answered by merging the sketches of the cells, as `summary` is; a
+        filter that splits a cell sketches the matching rows instead.
+        """
+        covered = self._covered_cells(spec)
+        if covered is None:
+            return MovieSketch.of(self.frame(spec, ['title', *SKETCH_COLUMNS]))
+        return MovieSketch().merge(*(self.cell_sketches[key] for key in covered))
+
+    def _covered_cells(self, spec):
+        """Keys of the cells whose movies all match `spec` (none of the others does); None if a filter splits a cell."""
+        covered = []
+        for (year, mask), stats in self.cell_stats.items():
+            match = self._cell_match(spec, year, mask, stats)
+            if match is None:
+                return None
+            if match:
+                covered.append((year, mask))
+        return covered
+
+    def _cell_match(self, spec, year, mask, stats):
+        """True when every movie of the cell matches `spec`, False when none does, None when only its rows can tell."""
+        if spec.genres is not None:
+            selected = sum(1 << self.genres.index(genre) for genre in spec.genres)
+            members = selected & mask
+            if not members or (spec.genre_mode == "all" and members != selected):
+                return False
+        every = not spec.title
+        for column, bounds in spec.predicates().items():
+            if column == 'year':
+                low, high, complete = year, year, True
+            else:
+                values = stats[column]
+                if not values.count:
+                    return False  # only missing values, which never match
+                low, high, complete = values.min, values.max, values.count == stats.rows
+            some, all_pass = bounds_cover(bounds, low, high, np.dtype(DTYPES[column]))
+            if not some:
+                return False
+            every = every and all_pass and complete
+        return True if every else None
+
+    def invalidate(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class MovieQuery(QueryEngine):
+    """The pandas engine: the whole table in one (shared, read-only) DataFrame."""
+
+    def __init__(self, movies, version=None, maxsize=128):
+        super().__init__(version, maxsize)
+        self.movies = movies
+        self.genre_index = GenreIndex(movies)
+        self.genres = self.genre_index.genres
+        self.column_indexes = ColumnIndexes(movies)
+        self.sort_indexes = dict(self.column_indexes.indexes)
+        self.lock = threading.Lock()
+
+    @cached_property
+    def title_index(self):
+        # built on the first title search or title sort
+        return TrigramIndex(self.movies['title'])
+
+    def extended(self, rows, version=None):
+        """A new engine over the movies with `rows` appended; this one is left as it is.
+
+        The indexes already built are extended with the new rows rather than
+        built again; the result cache starts empty.
+        """
+        movies = freeze(append_rows(self.movies, rows))
+        tail = movies.iloc[len(self.movies):]
+        engine = copy.copy(self)
+        QueryEngine.__init__(engine, version, self.cache.maxsize)
+        engine.movies = movies
+        engine.genre_index = self.genre_index.extended(tail)
+        engine.column_indexes = self.column_indexes.extended(tail)
+        engine.sort_indexes = dict(engine.column_indexes.indexes)
+        engine.lock = threading.Lock()
+        if 'title_index' in self.__dict__:
+            engine.title_index = self.title_index.extended(tail['title'])
+        if 'cell_stats' in self.__dict__:
+            # only the new movies are added to their cells
+            engine.cell_stats = merge_cells(self.cell_stats, cell_stats(tail, self.genres))
+        if 'cell_sketches' in self.__dict__:
+            engine.cell_sketches = merge_cells(self.cell_sketches, cell_sketches(tail, self.genres))
+        return engine
+
+    def column(self, name, rows=None):
+        values = self.movies[name].to_numpy()
+        return values if rows is None else values[rows]
+
+    def take(self, rows, columns=None):
+        movies = self.movies if columns is None else self.movies[list(columns)]
+        if len(rows) == len(movies) and (rows[1:] > rows[:-1]).all():
+            # nothing filtered out: hand back the shared frame itself, not a copy
+            return movies
+        return movies.iloc[rows]
+
+    def _sort(self, spec, sort, descending):
+        index = self._sort_index(sort)
+        keep = np.zeros(len(self.movies), dtype=bool)
+        keep[self.rows(spec)] = True
+        ordered = index.ordered(descending)
+        return ordered[keep[ordered]]
+
+    def _sort_index(self, column):
+        with self.lock:
+            index = self.sort_indexes.get(column)
+        if index is None:
+            # only the numeric columns are indexed up front
+            values = self.title_index.titles if column == 'title' else self.movies[column].to_numpy()
+            index = SortedIndex(values)
+            with self.lock:
+                self.sort_indexes[column] = index
+        return index
+
+    def _evaluate(self, spec):
+        if spec.genres is not None and not spec.genres:
+            return np.arange(0)
+        rows = self.column_indexes.select(spec.predicates())
+        if spec.title and spec.fuzzy:
+            return self._match_fuzzy(spec, rows)
+        if spec.title:
+            rows = self._match_title(spec, rows)
+        if rows is None:
+            rows = np.arange(len(self.movies))
+        if spec.genres is not None:
+            rows = rows[self.genre_index.match(spec.genres, spec.genre_mode)[rows]]
+        return rows
+
+    def _match_title(self, spec, rows):
+        """Substring title matches among `rows` (None: all rows), ascending."""
+        matches = self.title_index.search(spec.title)
+        if rows is None:
+            return matches
+        keep = np.zeros(len(self.movies), dtype=bool)
+        keep[rows] = True
+        return matches[keep[matches]]
+
+    def _match_fuzzy(self, spec, rows):
+        """The best fuzzy title matches among `rows` (None: all rows) in the selected genres, best first."""
+        keep = None
+        if rows is not None:
+            keep = np.zeros(len(self.movies), dtype=bool)
+            keep[rows] = True
+        if spec.genres is not None:
+            genres = self.genre_index.match(spec.genres, spec.genre_mode)
+            keep = genres if keep is None else keep & genres
+        matches, _ = self.title_index.fuzzy(spec.title, candidates=keep)
+        return matches
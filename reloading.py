@@ -0,0 +1,176 @@
+"""Pick up a rewritten or appended dataset without restarting the dashboards.
+
+A DatasetWatcher holds the query engine of one movie table and is shared by
+every session through `st.cache_resource`. Each script run asks it for
+`current()`, which stats the data files (the CSV, its columnar copy and the
+partition manifest) and only does more when one of them changed:
+
+- the CSV only grew, and the bytes read last time are still the same (their
+  hash is kept): only the new lines are parsed, and the pandas engine is
+  extended with them - genre masks, sorted indexes and the title index are
+  merged with the new rows instead of built again, the genre categories
+  grow and the version hash is continued from the old one;
+- anything else, or new lines that cannot be added that way: the engine is
+  opened again from scratch.
+
+The new engine is built on the side and swapped in with one assignment, so
+a script run sees a single version from start to end and every session
+gets the new one on its next rerun. Everything cached on the dataset
+version (aggregates, figures, title words) follows by itself. A file that
+cannot be read leaves the previous version in place.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from dataset import MOVIES_CSV, columnar_path, digest_version, frames_digest, freeze, load_dataset
+from engines import open_engine
+from partitions import MANIFEST, partitions_path
+from query import MovieQuery
+
+CHUNK = 1 << 20
+LOAD_ATTEMPTS = 3
+
+log = logging.getLogger(__name__)
+
+
+def _complete_length(f, size):
+    """Bytes up to and including the last newline; a line still being written is left out."""
+    position = size
+    while position > 0:
+        start = max(position - CHUNK, 0)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+def _hash(f, length):
+    digest = hashlib.sha1()
+    f.seek(0)
+    while length > 0:
+        chunk = f.read(min(CHUNK, length))
+        if not chunk:
+            break
+        digest.update(chunk)
+        length -= len(chunk)
+    return digest
+
+
+class DatasetWatcher:
+    def __init__(self, csv_path=MOVIES_CSV, kind=None):
+        self.csv_path = csv_path
+        self.kind = kind or os.environ.get("IMDB_ENGINE", "pandas")
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.appends = 0
+        self._load()
+
+    def _signature(self):
+        """(size, mtime) of every file the engine may be read from; None for a missing one."""
+        signature = []
+        manifest = os.path.join(partitions_path(self.csv_path), MANIFEST)
+        for path in (self.csv_path, columnar_path(self.csv_path), manifest):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def current(self):
+        """The engine of the dataset as it is on disk now."""
+        if self._signature() != self.signature:
+            with self.lock:
+                # another session may have caught up while we waited
+                if self._signature() != self.signature:
+                    self._refresh()
+        return self.engine
+
+    def stats(self):
+        return {"version": self.engine.version, "reloads": self.reloads, "appends": self.appends}
+
+    def _load(self):
+        for _ in range(LOAD_ATTEMPTS):
+            signature = self._signature()
+            scanned, rows_digest = None, None
+            if self.kind == "pandas":
+                # as open_engine does it, keeping the hash state for appends
+                scanned = self._scan()
+                movies = freeze(load_dataset(self.csv_path))
+                rows_digest = frames_digest([movies])
+                engine = MovieQuery(movies, digest_version(rows_digest))
+            else:
+                engine = open_engine(self.csv_path, self.kind)
+            if self._signature() == signature:
+                break
+            # written to while we read it: try again so the hash matches what was loaded
+        self.engine, self.signature, self.scanned, self.rows_digest = engine, signature, scanned, rows_digest
+
+    def _scan(self):
+        """(length, hash, header) of the CSV's complete lines; None when appends cannot be followed."""
+        try:
+            with open(self.csv_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                length = _complete_length(f, size)
+                if length != size:
+                    return None  # no newline at the end: the last row may still be growing
+                f.seek(0)
+                header = f.readline()
+                return length, _hash(f, length), header
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        signature = self._signature()
+        try:
+            appended = self._appended() if signature[1:] == self.signature[1:] else None
+            if appended is not None:
+                try:
+                    self._append(*appended)
+                    self.signature = signature
+                    return
+                except (TypeError, ValueError) as exc:
+                    log.info("could not append to %s, reading it again: %s", self.csv_path, exc)
+            self._load()
+            self.reloads += 1
+            log.info("reloaded %s: version %s", self.csv_path, self.engine.version)
+        except (OSError, ValueError) as exc:
+            # e.g. a file caught half-written; keep serving what we have until it changes again
+            log.warning("could not reload %s, keeping version %s: %s", self.csv_path, self.engine.version, exc)
+            self.signature = signature
+
+    def _append(self, rows, scanned):
+        if len(rows):
+            rows_digest = frames_digest([rows], self.rows_digest)
+            self.engine = self.engine.extended(rows, digest_version(rows_digest))
+            self.rows_digest = rows_digest
+            self.appends += 1
+            log.info("appended %d rows to %s: version %s", len(rows), self.csv_path, self.engine.version)
+        self.scanned = scanned
+
+    def _appended(self):
+        """The rows added at the end of the CSV since it was read and the scan state after them.
+
+        None when the CSV changed in any other way.
+        """
+        if self.kind != "pandas" or self.scanned is None:
+            return None
+        length, digest, header = self.scanned
+        with open(self.csv_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < length or _hash(f, length).digest() != digest.digest():
+                return None
+            end = _complete_length(f, size)
+            f.seek(length)
+            tail = f.read(end - length)
+        rows = pd.read_csv(io.BytesIO(header + tail)) if tail else pd.DataFrame()
+        digest = digest.copy()
+        digest.update(tail)
+        return rows, (end, digest, header)
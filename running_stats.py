@@ -0,0 +1,217 @@
+"""Mergeable running statistics for the Key Metrics panels.
+
+RunningStats keeps the count, sum, mean, sum of squared deviations (M2),
+min and max of one column with Welford's update, and Comoment the
+co-moment of two columns for their covariance and correlation. Both take
+one value at a time (`push`), a whole column at once (`of`), or another
+accumulator (`merge`, after Chan et al.): statistics computed over any
+split of the rows and merged give those of all the rows, so they can be
+kept per slice of the data and combined on demand. Missing values are
+skipped, as pandas does.
+
+MovieStats bundles what the dashboards show. An engine keeps one per
+(release year, genre set) cell - every movie is in exactly one - and a
+year/genre selection is answered by merging the cells it covers (see
+QueryEngine.summary).
+"""
+import math
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = ("imdb_score", "votes", "runtime")
+PAIR = ("imdb_score", "votes")
+
+
+@dataclass
+class RunningStats:
+    count: int = 0
+    total: float = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = None
+    max: float = None
+
+    @classmethod
+    def of(cls, values):
+        values = np.asarray(values)
+        if values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        if not len(values):
+            return cls()
+        wide = values.astype(np.float64)
+        mean = wide.mean()
+        # integer columns sum exactly
+        total = values.sum(dtype=np.int64 if values.dtype.kind in "iub" else np.float64).item()
+        return cls(len(values), total, float(mean), float(((wide - mean) ** 2).sum()),
+                   values.min().item(), values.max().item())
+
+    def push(self, value):
+        """Add one value (None or NaN is skipped)."""
+        if value is None or value != value:
+            return
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Statistics of both sets of values; neither accumulator is changed."""
+        if not other.count:
+            return RunningStats(**asdict(self))
+        if not self.count:
+            return RunningStats(**asdict(other))
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return RunningStats(
+            count,
+            self.total + other.total,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            min(self.min, other.min),
+            max(self.max, other.max),
+        )
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, as pandas); NaN below two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+@dataclass
+class Comoment:
+    """Running co-moment of two columns over the rows where both are present."""
+
+    count: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0
+    m2_y: float = 0.0
+    c: float = 0.0
+
+    @classmethod
+    def of(cls, x, y):
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        both = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[both], y[both]
+        if not len(x):
+            return cls()
+        dx, dy = x - x.mean(), y - y.mean()
+        return cls(len(x), float(x.mean()), float(y.mean()), float(dx @ dx), float(dy @ dy), float(dx @ dy))
+
+    def push(self, x, y):
+        if x is None or y is None or x != x or y != y:
+            return
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c += dx * (y - self.mean_y)
+
+    def merge(self, other):
+        if not other.count:
+            return Comoment(**asdict(self))
+        if not self.count:
+            return Comoment(**asdict(other))
+        count = self.count + other.count
+        dx, dy = other.mean_x - self.mean_x, other.mean_y - self.mean_y
+        weight = self.count * other.count / count
+        return Comoment(
+            count,
+            self.mean_x + dx * other.count / count,
+            self.mean_y + dy * other.count / count,
+            self.m2_x + other.m2_x + dx * dx * weight,
+            self.m2_y + other.m2_y + dy * dy * weight,
+            self.c + other.c + dx * dy * weight,
+        )
+
+    @property
+    def covariance(self):
+        return self.c / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def correlation(self):
+        """Pearson correlation; NaN when either column is constant."""
+        spread = math.sqrt(self.m2_x * self.m2_y)
+        return self.c / spread if spread else math.nan
+
+
+@dataclass
+class MovieStats:
+    rows: int = 0
+    columns: dict = field(default_factory=dict)
+    pair: Comoment = field(default_factory=Comoment)
+
+    @classmethod
+    def of(cls, frame):
+        """Statistics of a frame holding the STATS_COLUMNS."""
+        return cls(
+            len(frame),
+            {column: RunningStats.of(frame[column].to_numpy()) for column in STATS_COLUMNS},
+            Comoment.of(frame[PAIR[0]].to_numpy(), frame[PAIR[1]].to_numpy()),
+        )
+
+    def push(self, row):
+        """Add one movie, a mapping from column to value."""
+        self.rows += 1
+        for column in STATS_COLUMNS:
+            self.columns.setdefault(column, RunningStats()).push(row[column])
+        self.pair.push(row[PAIR[0]], row[PAIR[1]])
+
+    def merge(self, other):
+        return MovieStats(
+            self.rows + other.rows,
+            {column: self[column].merge(other[column]) for column in STATS_COLUMNS},
+            self.pair.merge(other.pair),
+        )
+
+    def __getitem__(self, column):
+        return self.columns.get(column) or RunningStats()
+
+    @property
+    def correlation(self):
+        """Correlation of IMDb score and votes."""
+        return self.pair.correlation
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["rows"], {column: RunningStats(**stats) for column, stats in data["columns"].items()},
+                   Comoment(**data["pair"]))
+
+
+def cells(movies, genres):
+    """Row positions of every (year, genre bitmask) cell of a movie table, bit i for genres[i], in key order."""
+    if not len(movies):
+        return {}
+    masks = np.zeros(len(movies), dtype=np.int64)
+    for i, genre in enumerate(genres):
+        masks |= movies[genre].to_numpy(dtype=bool).astype(np.int64) << i
+    groups = pd.Series(masks).groupby([movies['year'].to_numpy(), masks]).indices
+    return {(int(year), int(mask)): rows for (year, mask), rows in sorted(groups.items())}
+
+
+def cell_stats(movies, genres):
+    """MovieStats per (year, genre bitmask) cell of a movie table, bit i for genres[i]."""
+    return {key: MovieStats.of(movies.iloc[rows]) for key, rows in cells(movies, genres).items()}
+
+
+def merge_cells(stats, other):
+    """Cell statistics (or sketches) of two disjoint sets of rows, e.g. the old rows and the appended ones."""
+    merged = dict(stats)
+    for key, cell in other.items():
+        merged[key] = merged[key].merge(cell) if key in merged else cell
+    return merged
@@ -0,0 +1,250 @@
+"""Scrape IMDb advanced-search results for a list of (genre, year) jobs.
+
+Every job is one genre/year search page. Jobs run at the same time on a
+bounded pool of headless browser workers, each worker keeping one browser
+open for all the jobs it picks up. Browsers are started from a
+BrowserProfile that blocks images, fonts, media and ad/tracking domains;
+the report shows bytes transferred and page-load time per job.
+
+    python scrape.py --genre fantasy --genre family --year 2024 --workers 2
+
+`--backend http` skips the browser and reads the paginated results over
+plain HTTP instead (see scrape_http.py). `--incremental` keeps a checkpoint
+so an interrupted run resumes and later runs only merge new or changed
+rows into the existing CSVs.
+"""
+import argparse
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+from browser_profile import BrowserProfile, page_stats
+from checkpoint import DEFAULT_PATH, CheckpointStore
+from pagination import LoadMoreController
+
+SEARCH_URL = "https://www.imdb.com/search/title/"
+GENRES = ["fantasy", "animation", "adventure", "family"]
+
+# XPath to find all list items (li elements) of the search results
+LIST_XPATH = '//*[@id="__next"]/main/div[2]/div[3]/section/section/div/section/section/div[2]/div/section/div[2]/div[2]/ul/li'
+MORE_XPATH = "//span[contains(text(), ' more')]"
+
+
+@dataclass
+class ScrapeJob:
+    genre: str
+    year: int = 2024
+    output: str = None
+
+    def url(self, base_url=SEARCH_URL):
+        return (f"{base_url}?title_type=feature"
+                f"&release_date={self.year}-01-01,{self.year}-12-31"
+                f"&genres={self.genre.lower()}")
+
+    @property
+    def output_path(self):
+        return self.output or f"{self.genre.capitalize()}_IMDb{self.year}_list.csv"
+
+
+@dataclass
+class JobResult:
+    job: ScrapeJob
+    rows: int = 0
+    seconds: float = 0.0
+    error: str = None
+    bytes: int = 0
+    load_seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def make_driver(headless=True, profile=None):
+    return (profile or BrowserProfile(headless=headless)).launch()
+
+
+# Read every result `li` in one WebDriver round trip. arguments[0] is the
+# XPath of the list items; each item comes back as a plain JSON object.
+EXTRACT_JS = r"""
+const snapshot = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const text = (li, selector) => {
+  const el = li.querySelector(selector);
+  return el ? el.textContent.trim() : null;
+};
+const rows = [];
+for (let i = 0; i < snapshot.snapshotLength; i++) {
+  const li = snapshot.snapshotItem(i);
+  const link = li.querySelector('a[href*="/title/tt"]');
+  const id = link ? link.getAttribute('href').match(/tt\d+/) : null;
+  const runtime = Array.from(li.querySelectorAll('.dli-title-metadata-item'))
+    .map(el => el.textContent.trim())
+    .find(t => t && /^(\d+h)?\s*(\d+m)?$/.test(t));
+  rows.push({
+    title_id: id ? id[0] : null,
+    title: text(li, 'h3'),
+    runtime: runtime || null,
+    rating: text(li, '.ipc-rating-star--rating'),
+    votes: text(li, '.ipc-rating-star--voteCount'),
+  });
+}
+return rows;
+"""
+
+
+def extract_items(driver, list_xpath=LIST_XPATH):
+    """Return one row per result `li`, read with a single execute_script call."""
+    return [
+        {
+            "TitleId": item["title_id"],
+            "Title": item["title"],
+            "Runtime": item["runtime"],
+            "IMDB_Score": item["rating"] or 0,
+            "Votes": f" {item['votes']}" if item["votes"] else 0,
+        }
+        for item in driver.execute_script(EXTRACT_JS, list_xpath)
+    ]
+
+
+def scrape_page(driver, url, max_clicks=None, list_xpath=LIST_XPATH, timeout=15):
+    """Load one search page, click "X more" until every result is loaded and read the rows.
+
+    `max_clicks` caps the number of "more" clicks; by default the page is
+    paged until the item count matches the total shown on the page.
+    """
+    driver.get(url)
+    LoadMoreController(driver, list_xpath, MORE_XPATH, max_clicks=max_clicks, timeout=timeout).load_all()
+    return extract_items(driver, list_xpath)
+
+
+def save_rows(rows, path):
+    # TitleId is kept on the rows for bookkeeping but not written to the CSV
+    df = pd.DataFrame(rows, columns=["Title", "Runtime", "IMDB_Score", "Votes"])
+    # Remove columns where all values are NaN
+    df.dropna(axis=1, how='all', inplace=True)
+    df.to_csv(path, index=False, encoding="utf-8")
+    return len(df)
+
+
+def run_job(driver, job, base_url=SEARCH_URL, checkpoint=None, **page_options):
+    start = time.perf_counter()
+    try:
+        page_stats(driver)  # drain whatever the previous job left in the log
+        rows = scrape_page(driver, job.url(base_url), **page_options)
+        stats = page_stats(driver)
+        if checkpoint:
+            count = checkpoint.commit_job(job, rows)
+        else:
+            count = save_rows(rows, job.output_path)
+        return JobResult(job, rows=count, seconds=time.perf_counter() - start,
+                         bytes=stats.bytes, load_seconds=stats.load_seconds)
+    except Exception as exc:
+        return JobResult(job, seconds=time.perf_counter() - start, error=f"{type(exc).__name__}: {exc}")
+
+
+def scrape_genres(jobs, max_workers=2, base_url=SEARCH_URL, driver_factory=make_driver, checkpoint=None,
+                  **page_options):
+    """Run every job on at most `max_workers` browsers and return one JobResult per job.
+
+    With a checkpoint store (see checkpoint.py) only new or changed rows are
+    merged into each CSV instead of rewriting it.
+
+    A failing job is reported in its JobResult and does not stop the others.
+    Results come back in the same order as `jobs`.
+    """
+    jobs = list(jobs)
+    pending = queue.Queue()
+    for index, job in enumerate(jobs):
+        pending.put((index, job))
+    results = [None] * len(jobs)
+    lock = threading.Lock()
+
+    def worker():
+        driver = None
+        try:
+            while True:
+                try:
+                    index, job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if driver is None:
+                    try:
+                        driver = driver_factory()
+                    except Exception as exc:
+                        with lock:
+                            results[index] = JobResult(job, error=f"browser start failed: {exc}")
+                        continue
+                result = run_job(driver, job, base_url, checkpoint, **page_options)
+                with lock:
+                    results[index] = result
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    workers = max(1, min(max_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            pool.submit(worker)
+    return results
+
+
+def print_report(results):
+    for result in results:
+        status = "ok" if result.ok else f"FAILED ({result.error})"
+        print(f"{result.job.genre:<10} {result.job.year}  {result.rows:>5} rows  "
+              f"{result.seconds:6.1f}s  load {result.load_seconds:5.1f}s  {result.bytes / 1e6:7.2f} MB  "
+              f"{result.job.output_path}  {status}")
+    total = sum(result.bytes for result in results)
+    if total:
+        print(f"total transferred: {total / 1e6:.2f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape IMDb search results per genre and year.")
+    parser.add_argument("--genre", action="append", help="genre to scrape (repeatable, default: all four)")
+    parser.add_argument("--year", type=int, action="append", help="release year (repeatable, default: 2024)")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="selenium",
+                        help="render pages in Chrome or fetch them over plain HTTP")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="browsers (selenium) or concurrent requests (http) running at once")
+    parser.add_argument("--base-url", default=SEARCH_URL, help="search page URL, e.g. a local http.server")
+    parser.add_argument("--show-browser", action="store_true", help="do not run the browsers headless")
+    parser.add_argument("--no-blocking", action="store_true",
+                        help="load images, fonts, media and third-party scripts too")
+    parser.add_argument("--max-clicks", type=int, help='cap on "X more" clicks per page (selenium)')
+    parser.add_argument("--incremental", action="store_true",
+                        help="resume interrupted runs and only merge new or changed rows into the CSVs")
+    parser.add_argument("--checkpoint", default=DEFAULT_PATH, help="checkpoint file for --incremental")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log time spent per result page")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+
+    jobs = [ScrapeJob(genre, year) for year in (args.year or [2024]) for genre in (args.genre or GENRES)]
+    profile = BrowserProfile(headless=not args.show_browser)
+    if args.no_blocking:
+        profile.block_types, profile.blocked_domains = (), []
+
+    checkpoint = CheckpointStore(args.checkpoint) if args.incremental else None
+
+    if args.backend == "http":
+        import scrape_http
+
+        results = scrape_http.scrape_genres(jobs, concurrency=args.workers, base_url=args.base_url,
+                                            checkpoint=checkpoint)
+    else:
+        results = scrape_genres(jobs, max_workers=args.workers, base_url=args.base_url,
+                                driver_factory=profile.launch, checkpoint=checkpoint,
+                                max_clicks=args.max_clicks)
+    if checkpoint:
+        checkpoint.close()
+    print_report(results)
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
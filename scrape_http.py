@@ -0,0 +1,135 @@
+"""Browserless scrape backend: fetch IMDb search pages over plain HTTP.
+
+Each search page embeds its results as JSON in the `__NEXT_DATA__` script
+tag, so there is no need to render the page or click "X more". Pages are
+requested with `start=` offsets over one shared keep-alive connection pool,
+with at most `concurrency` requests in flight.
+
+The rows written are the same `Title,Runtime,IMDB_Score,Votes` shape the
+Selenium backend produces, so the cleaning step does not care which one ran.
+"""
+import asyncio
+import json
+import re
+import time
+
+from scrape import SEARCH_URL, JobResult, save_rows
+
+PAGE_SIZE = 50
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+NEXT_DATA_RE = re.compile(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', re.S)
+
+
+def format_runtime(seconds):
+    """3000 -> "50m", 6000 -> "1h 40m" (the text IMDb renders)."""
+    if not seconds:
+        return None
+    hours, minutes = divmod(int(seconds) // 60, 60)
+    if hours and minutes:
+        return f"{hours}h {minutes}m"
+    return f"{hours}h" if hours else f"{minutes}m"
+
+
+def format_votes(count):
+    """91000 -> " (91K)", 2700 -> " (2.7K)", 0/None -> 0."""
+    if not count:
+        return 0
+    for limit, suffix in ((1_000_000, "M"), (1_000, "K")):
+        if count >= limit:
+            value = count / limit
+            value = f"{value:.1f}".rstrip("0").rstrip(".") if value < 10 else f"{value:.0f}"
+            return f" ({value}{suffix})"
+    return f" ({count})"
+
+
+def parse_search_page(html):
+    """Return (total, items) from the page's embedded JSON."""
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        raise ValueError("search page has no __NEXT_DATA__ JSON")
+    results = json.loads(match.group(1))["props"]["pageProps"]["searchResults"]["titleResults"]
+    return results.get("total", 0), results.get("titleListItems", [])
+
+
+def item_to_row(position, item):
+    rating = item.get("ratingSummary") or {}
+    return {
+        "TitleId": item.get("titleId"),
+        "Title": f"{position}. {item.get('titleText')}",
+        "Runtime": format_runtime(item.get("runtime")),
+        # as the page shows it ("7", not "7.0"), like the Selenium backend's text
+        "IMDB_Score": format(rating.get("aggregateRating") or 0, "g"),
+        "Votes": format_votes(rating.get("voteCount")),
+    }
+
+
+async def fetch_page(session, semaphore, url, start):
+    async with semaphore:
+        async with session.get(url, params={"start": start, "count": PAGE_SIZE}) as response:
+            response.raise_for_status()
+            return await response.text()
+
+
+def page_rows(start, items):
+    return [item_to_row(start + offset, item) for offset, item in enumerate(items)]
+
+
+async def scrape_job(session, semaphore, job, base_url=SEARCH_URL, max_results=None, checkpoint=None):
+    """Fetch every page of one job and write its CSV.
+
+    With a checkpoint store, pages saved by an interrupted run are not
+    fetched again and only new or changed rows are merged into the CSV.
+    """
+    start_time = time.perf_counter()
+    url = job.url(base_url)
+    done = checkpoint.completed_pages(job) if checkpoint else set()
+    pages = {}
+
+    async def load(start):
+        if start in done:
+            return
+        _, items = parse_search_page(await fetch_page(session, semaphore, url, start))
+        pages[start] = items
+        if checkpoint:
+            checkpoint.save_page(job, start, page_rows(start, items))
+
+    try:
+        total, first = parse_search_page(await fetch_page(session, semaphore, url, 1))
+        if max_results is not None:
+            total = min(total, max_results)
+        pages[1] = first
+        if checkpoint and 1 not in done:
+            checkpoint.save_page(job, 1, page_rows(1, first))
+        # step by the page size the server actually returns, which may be less than `count`
+        starts = range(1 + len(first), total + 1, len(first)) if first else []
+        await asyncio.gather(*(load(start) for start in starts))
+
+        if checkpoint:
+            count = checkpoint.commit_job(job, checkpoint.pending_rows(job)[:total])
+        else:
+            rows = [row for start in sorted(pages) for row in page_rows(start, pages[start])]
+            count = save_rows(rows[:total], job.output_path)
+        return JobResult(job, rows=count, seconds=time.perf_counter() - start_time)
+    except Exception as exc:
+        return JobResult(job, seconds=time.perf_counter() - start_time, error=f"{type(exc).__name__}: {exc}")
+
+
+async def scrape_genres_async(jobs, concurrency=8, base_url=SEARCH_URL, max_results=None, checkpoint=None):
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=timeout) as session:
+        return await asyncio.gather(
+            *(scrape_job(session, semaphore, job, base_url, max_results, checkpoint) for job in jobs)
+        )
+
+
+def scrape_genres(jobs, concurrency=8, base_url=SEARCH_URL, max_results=None, checkpoint=None):
+    """Blocking wrapper around scrape_genres_async; returns one JobResult per job."""
+    return list(asyncio.run(scrape_genres_async(list(jobs), concurrency, base_url, max_results, checkpoint)))
@@ -0,0 +1,311 @@
+"""Mergeable sketches behind the approximate mode of the dashboards.
+
+Where running_stats.py keeps exact moments, the distribution charts need
+the values themselves, and scanning them does not stay interactive at tens
+of millions of rows. A sketch keeps a small, fixed-size summary instead:
+
+    KLLSketch      quantiles, ranks and histograms of one column
+                   (Karnin, Lang, Liberty), within a rank error set by `k`
+    FixedHistogram counts in bins fixed up front (IMDb scores, 0.5 wide)
+    HyperLogLog    the number of distinct values (titles)
+
+Each merges with another of its kind into the sketch of both sets of
+rows, so, like the running statistics, they are kept per (release year,
+genre set) cell and a selection is answered by merging the cells it
+covers (see QueryEngine.sketch). The error bounds are reported next to
+the answers: `rank_error`/`bin_error` as a fraction of the rows (99%
+confidence, the figures of the DataSketches KLL for the same `k`, which
+`python benchmarks.py sketches` checks), `HyperLogLog.relative_error` as
+one standard error. A sketch of fewer than `k` values holds them all and
+is exact.
+"""
+import base64
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from running_stats import cells
+
+KLL_K = 200
+MIN_WIDTH = 8
+HLL_PRECISION = 12
+SCORE_EDGES = tuple(np.linspace(0.0, 10.0, 21))
+SKETCH_COLUMNS = ("imdb_score", "votes")
+
+
+def _pack(array):
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(array).tobytes())).decode("ascii")
+
+
+def _unpack(text, dtype):
+    return np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=dtype).copy()
+
+
+class KLLSketch:
+    """Quantile sketch of one column; missing values are skipped.
+
+    Level h holds values standing for 2**h rows each. A level over its
+    capacity is sorted and every other value (from a random offset) moves
+    up one level, so the sketch keeps O(k log(n / k)) values.
+    """
+
+    def __init__(self, k=KLL_K, levels=None, count=0, min=None, max=None):
+        self.k = k
+        self.levels = levels or [np.empty(0)]
+        self.count = count
+        self.min = min
+        self.max = max
+
+    @classmethod
+    def of(cls, values, k=KLL_K):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls(k)
+        # sorted, so the sketch does not depend on the order of the rows
+        values = np.sort(values)
+        sketch = cls(k, [values], len(values), float(values[0]), float(values[-1]))
+        sketch._compress()
+        return sketch
+
+    def merge(self, *others):
+        """Sketch of all the values; none of the sketches is changed."""
+        sketches = [self, *others]
+        height = max(len(sketch.levels) for sketch in sketches)
+        levels = [np.concatenate([sketch.levels[h] for sketch in sketches if h < len(sketch.levels)])
+                  for h in range(height)]
+        present = [sketch for sketch in sketches if sketch.count]
+        merged = KLLSketch(
+            min(sketch.k for sketch in sketches), levels, sum(sketch.count for sketch in sketches),
+            min((sketch.min for sketch in present), default=None),
+            max((sketch.max for sketch in present), default=None),
+        )
+        merged._compress()
+        return merged
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_WIDTH, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        while sum(map(len, self.levels)) > sum(self._capacity(h) for h in range(len(self.levels))):
+            level = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            values = np.sort(self.levels[level])
+            odd = len(values) % 2
+            # the same values always compact the same way, so every engine gives the same sketch
+            offset = np.random.default_rng((self.count, level, len(values))).integers(2)
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], values[odd + offset::2]])
+            self.levels[level] = values[:odd]
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self):
+        """Bound on the error of a rank or quantile, as a fraction of the values."""
+        return 0.0 if self.exact else 2.296 / self.k ** 0.9723
+
+    @property
+    def bin_error(self):
+        """Bound on the error of every bin of a histogram, as a fraction of the values."""
+        return 0.0 if self.exact else 2.446 / self.k ** 0.9433
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.int64) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """The value of rank `q` (0 to 1); NaN when there are no values."""
+        if not self.count:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, cumulative = self._weighted()
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(values[min(position, len(values) - 1)])
+
+    def rank(self, value):
+        """Fraction of the values <= `value`."""
+        if not self.count:
+            return math.nan
+        values, cumulative = self._weighted()
+        position = np.searchsorted(values, value, side="right")
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    def histogram(self, bins=20):
+        """Estimated counts in `bins` equal bins from min to max (the last one closed), with their error bound."""
+        if not self.count:
+            return pd.DataFrame({"start": [], "end": [], "count": [], "error": []})
+        edges = np.linspace(self.min, self.max, bins + 1)
+        values, cumulative = self._weighted()
+        cumulative = np.concatenate([[0], cumulative]) * (self.count / cumulative[-1])
+        below = cumulative[np.searchsorted(values, edges, side="left")]
+        below[-1] = self.count
+        return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": np.diff(below).round().astype(np.int64),
+                             "error": self.bin_error * self.count})
+
+    def to_dict(self):
+        return {"k": self.k, "count": self.count, "min": self.min, "max": self.max,
+                "levels": [_pack(level.astype(np.float64)) for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["k"], [_unpack(level, np.float64) for level in data["levels"]], data["count"],
+                   data["min"], data["max"])
+
+
+class FixedHistogram:
+    """Counts of one column in bins fixed up front, the last one closed; other values are left out."""
+
+    def __init__(self, edges=SCORE_EDGES, counts=None):
+        self.edges = tuple(edges)
+        self.counts = np.zeros(len(edges) - 1, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def of(cls, values, edges=SCORE_EDGES):
+        values = np.asarray(values, dtype=np.float64)
+        return cls(edges, np.histogram(values[~np.isnan(values)], bins=edges)[0].astype(np.int64))
+
+    def merge(self, *others):
+        if any(other.edges != self.edges for other in others):
+            raise ValueError("histograms with different bins cannot be merged")
+        return FixedHistogram(self.edges, self.counts + sum(other.counts for other in others))
+
+    def frame(self):
+        return pd.DataFrame({"start": self.edges[:-1], "end": self.edges[1:], "count": self.counts})
+
+    def to_dict(self):
+        return {"edges": list(self.edges), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["edges"], np.array(data["counts"], dtype=np.int64))
+
+
+def value_hashes(values):
+    """64-bit hashes of the values that are present, the same for a string whatever its dtype."""
+    values = pd.Series(values).dropna()
+    return pd.util.hash_pandas_object(values.astype(object), index=False).to_numpy()
+
+
+class HyperLogLog:
+    """Distinct count of one column (Flajolet et al.) in 2**precision one-byte registers."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    @classmethod
+    def of(cls, values, precision=HLL_PRECISION):
+        return cls.of_hashes(value_hashes(values), precision)
+
+    @classmethod
+    def of_hashes(cls, hashes, precision=HLL_PRECISION):
+        """Sketch of the values with these `value_hashes` (missing values already left out)."""
+        sketch = cls(precision)
+        if not len(hashes):
+            return sketch
+        # the first `precision` bits pick the register, the rest count leading zeros
+        index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+        rest = hashes << np.uint64(precision)
+        high, low = (rest >> np.uint64(32)).astype(np.float64), (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            zeros = np.where(high > 0, 31 - np.floor(np.log2(high)),
+                             np.where(low > 0, 63 - np.floor(np.log2(low)), 64))
+        rank = np.minimum(zeros + 1, 64 - precision + 1).astype(np.uint8)
+        np.maximum.at(sketch.registers, index, rank)
+        return sketch
+
+    def merge(self, *others):
+        if any(other.precision != self.precision for other in others):
+            raise ValueError("HyperLogLogs of different precision cannot be merged")
+        return HyperLogLog(self.precision, np.maximum.reduce([self.registers, *(other.registers for other in others)]))
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate, as a fraction of it."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            return m * math.log(m / empty)  # few values: linear counting
+        return float(raw)
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": _pack(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["precision"], _unpack(data["registers"], np.uint8))
+
+
+class MovieSketch:
+    """The sketches the dashboards chart: score and vote quantiles, score histogram, distinct titles."""
+
+    def __init__(self, rows=0, quantiles=None, histogram=None, titles=None):
+        self.rows = rows
+        self.quantiles = quantiles or {column: KLLSketch() for column in SKETCH_COLUMNS}
+        self.histogram = histogram or FixedHistogram()
+        self.titles = titles or HyperLogLog()
+
+    @classmethod
+    def of(cls, frame):
+        """Sketches of a frame holding the title and the SKETCH_COLUMNS."""
+        return cls._of_columns(len(frame), _columns(frame), value_hashes(frame['title']))
+
+    @classmethod
+    def _of_columns(cls, rows, columns, hashes):
+        return cls(
+            rows,
+            {column: KLLSketch.of(columns[column]) for column in SKETCH_COLUMNS},
+            FixedHistogram.of(columns['imdb_score']),
+            HyperLogLog.of_hashes(hashes),
+        )
+
+    def merge(self, *others):
+        return MovieSketch(
+            self.rows + sum(other.rows for other in others),
+            {column: self.quantiles[column].merge(*(other.quantiles[column] for other in others))
+             for column in SKETCH_COLUMNS},
+            self.histogram.merge(*(other.histogram for other in others)),
+            self.titles.merge(*(other.titles for other in others)),
+        )
+
+    def to_dict(self):
+        return {"rows": self.rows, "quantiles": {column: sketch.to_dict() for column, sketch in self.quantiles.items()},
+                "histogram": self.histogram.to_dict(), "titles": self.titles.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["rows"], {column: KLLSketch.from_dict(sketch) for column, sketch in data["quantiles"].items()},
+                   FixedHistogram.from_dict(data["histogram"]), HyperLogLog.from_dict(data["titles"]))
+
+
+def _columns(frame):
+    return {column: frame[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in SKETCH_COLUMNS}
+
+
+def cell_sketches(movies, genres):
+    """MovieSketch per (year, genre bitmask) cell of a movie table, bit i for genres[i]."""
+    # columns converted and titles hashed once for the whole table, not per cell
+    columns = _columns(movies)
+    present = movies['title'].notna().to_numpy()
+    hashes = np.zeros(len(movies), dtype=np.uint64)
+    hashes[present] = value_hashes(movies['title'])
+    return {
+        key: MovieSketch._of_columns(len(rows), {column: values[rows] for column, values in columns.items()},
+                                     hashes[rows][present[rows]])
+        for key, rows in cells(movies, genres).items()
+    }
@@ -0,0 +1,55 @@
+"""Shared fixtures: the repository modules on sys.path and a local stand-in for the IMDb search page."""
+import functools
+import http.server
+import os
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+sys.path.insert(0, ROOT)
+
+
+class SearchPageHandler(http.server.SimpleHTTPRequestHandler):
+    """Answers `/search/title/?genres=<genre>` with the saved page `pages/<genre>.html`.
+
+    With `&start=<n>` (the HTTP backend's paging) the page is
+    `pages/<genre>_start<n>.html`; the (genre, start) pairs in
+    `server.fail` get a 500 instead.
+    """
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        genre = query.get("genres", [""])[0]
+        start = int(query["start"][0]) if "start" in query else None
+        self.server.requests.append(genre if start is None else (genre, start))
+        if (genre, start) in self.server.fail:
+            self.send_error(500)
+            return
+        self.page = f"{genre}.html" if start is None else f"{genre}_start{start}.html"
+        super().do_GET()
+
+    def translate_path(self, path):
+        return os.path.join(PAGES, self.page)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def imdb_server():
+    """The saved search pages on a free localhost port; `.url` is the search URL to scrape."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(SearchPageHandler, directory=PAGES))
+    server.requests = []
+    server.fail = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/search/title/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,68 @@
+"""The vectorized parsers of cleaning.py on the raw field formats of the search page."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleaning import COLUMNS, clean_frame, clean_titles, runtime_to_minutes, scores_to_float, votes_to_int
+
+
+def parsed(parse, values):
+    return parse(pd.Series(values, dtype=object)).tolist()
+
+
+@pytest.mark.parametrize("raw, minutes", [
+    ("1h 40m", 100), ("2h", 120), ("45m", 45), ("1h40m", 100), (" 3h 5m ", 185),
+    ("90", 90), (95, 95), ("", pd.NA), (None, pd.NA), (np.nan, pd.NA), ("soon", pd.NA), ("1h 40", pd.NA),
+])
+def test_runtime_to_minutes(raw, minutes):
+    [result] = parsed(runtime_to_minutes, [raw])
+    assert result is pd.NA if minutes is pd.NA else result == minutes
+
+
+@pytest.mark.parametrize("raw, votes", [
+    (" (91K)", 91_000), ("(2.7K)", 2_700), ("1.2M", 1_200_000), ("1,234", 1_234), ("(12)", 12), ("3k", 3_000),
+    ("", 0), (None, 0), (np.nan, 0), ("many", 0), (0, 0),
+])
+def test_votes_to_int(raw, votes):
+    assert parsed(votes_to_int, [raw]) == [votes]
+
+
+@pytest.mark.parametrize("raw, score", [("6.7", 6.7), (" 7 ", 7.0), (8.1, 8.1), ("", None), (None, None), ("N/A", None)])
+def test_scores_to_float(raw, score):
+    [result] = parsed(scores_to_float, [raw])
+    assert np.isnan(result) if score is None else result == score
+
+
+def test_clean_titles_drops_only_the_rank_prefix():
+    titles = pd.Series(["12. Moana 2", "1.Flow", "2001: A Space Odyssey", "9. 1917", "Plain", None], dtype=object)
+
+    cleaned = clean_titles(titles)
+
+    assert cleaned.tolist()[:5] == ["Moana 2", "Flow", "2001: A Space Odyssey", "1917", "Plain"]
+    assert cleaned.isna().tolist() == [False] * 5 + [True]
+
+
+def test_repeated_values_are_parsed_once_and_spread_back_in_place():
+    runtimes = pd.Series(["2h", None, "45m", "2h", "", "45m"], index=[10, 11, 12, 13, 14, 15], dtype=object)
+
+    minutes = runtime_to_minutes(runtimes)
+
+    assert minutes.index.tolist() == runtimes.index.tolist()
+    assert minutes.astype(object).where(minutes.notna(), None).tolist() == [120, None, 45, 120, None, 45]
+
+
+def test_clean_frame_reads_csv_headers_and_table_columns():
+    raw = pd.DataFrame({"Title": ["1. Moana 2", "2. Flow"], "Runtime": ["1h 40m", ""],
+                        "IMDB_Score": ["6.7", "8"], "Votes": [" (91K)", None]})
+    table = raw.rename(columns=str.lower).assign(genre="Family")  # the TiDB tables
+
+    from_csv = clean_frame(raw, "Family")
+    from_table = clean_frame(table)
+
+    assert list(from_csv.columns) == COLUMNS
+    assert from_csv["title"].tolist() == ["Moana 2", "Flow"]
+    assert from_csv["runtime"].tolist()[0] == 100 and from_csv["runtime"].isna().tolist() == [False, True]
+    assert from_csv["imdb_score"].tolist() == [6.7, 8.0]
+    assert from_csv["votes"].tolist() == [91_000, 0]
+    assert from_csv["genre"].tolist() == ["Family", "Family"]
+    pd.testing.assert_frame_equal(from_table, from_csv)
@@ -0,0 +1,104 @@
+"""The three query engines over the same small movie tables."""
+import os
+
+import pandas as pd
+import pytest
+
+import dataset
+import engines
+import partitions
+from conftest import ROOT
+from query import FilterSpec
+
+
+def write_archive(directory, movies):
+    """movies.csv with its columnar copy and partitions in `directory`; returns the CSV path."""
+    csv_path = os.path.join(directory, "movies.csv")
+    movies.to_csv(csv_path, index=False)
+    dataset.write_columnar(movies, dataset.columnar_path(csv_path))
+    partitions.write_partitions(movies, partitions.partitions_path(csv_path))
+    return csv_path
+
+
+def movie(title, family=False, fantasy=False, imdb_score=6.0):
+    return {"title": title, "year": 2024, "runtime": 90, "imdb_score": imdb_score, "votes": 100,
+            "Fantasy": fantasy, "Family": family}
+
+
+@pytest.mark.parametrize("kind", engines.ENGINES)
+def test_fuzzy_titles_are_ranked_among_the_filtered_movies(tmp_path, kind):
+    # 200 closer matches in another genre would fill the best 50 of the whole table
+    movies = pd.DataFrame([movie(f"Robot {i}", family=True) for i in range(200)]
+                          + [movie("The Robots of Dawn", fantasy=True, imdb_score=7.0)])
+    engine = engines.open_engine(write_archive(str(tmp_path), movies), kind)
+
+    by_genre = FilterSpec.make(genres=["Fantasy"], title="robot", fuzzy=True)
+    by_score = FilterSpec.make(min_score=6.5, title="robot", fuzzy=True)
+
+    assert engine.page(by_genre, 0, 10, "title", False)["title"].tolist() == ["The Robots of Dawn"]
+    assert engine.count(by_score) == 1
+    assert engine.count(FilterSpec.make(title="robot", fuzzy=True)) == 50
+
+
+@pytest.fixture(scope="module", params=["one year", "five years"])
+def archive(request, tmp_path_factory):
+    """The repository's movies.csv, as it is and spread over five release years, with every engine's files."""
+    movies = pd.read_csv(os.path.join(ROOT, "movies.csv"))
+    if request.param == "five years":
+        movies["year"] = 2020 + movies.index % 5
+    return write_archive(str(tmp_path_factory.mktemp("archive")), movies)
+
+
+def test_pandas_and_arrow_answer_alike(archive):
+    differences, total = engines.check_parity([engines.open_engine(archive, kind) for kind in ("pandas", "arrow")])
+
+    assert total > 300
+    assert differences == []
+
+
+def test_partitions_answer_like_their_files_read_in_order(archive):
+    partitioned = engines.open_engine(archive, "partitioned")
+
+    differences, _ = engines.check_parity([engines.ArrowEngine(partitioned.manifest.paths()), partitioned])
+
+    assert differences == []
+
+
+def by_title(frame):
+    return frame.sort_values(["title", "year"], kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("spec", engines.PARITY_SPECS, ids=str)
+def test_pandas_and_partitioned_find_the_same_movies(archive, spec):
+    # the partitions hold the rows in another order, so compare them sorted
+    pandas, partitioned = (engines.open_engine(archive, kind) for kind in ("pandas", "partitioned"))
+
+    pd.testing.assert_frame_equal(by_title(partitioned.frame(spec)), by_title(pandas.frame(spec)))
+    assert partitioned.count(spec) == pandas.count(spec)
+    assert partitioned.aggregate("votes", "sum", spec) == pandas.aggregate("votes", "sum", spec)
+    assert partitioned.aggregate("imdb_score", "mean", spec) == pytest.approx(pandas.aggregate("imdb_score", "mean", spec),
+                                                                              nan_ok=True)
+
+
+@pytest.mark.parametrize("kind", engines.ENGINES)
+@pytest.mark.parametrize("spec", [engines.ALL, FilterSpec.make(genres=["Family"]), FilterSpec.make(year=(2022, 2023)),
+                                  FilterSpec.make(min_score=7.0), FilterSpec.make(genres=["Fantasy"], title="the")],
+                         ids=str)
+def test_bounds_agree_with_the_column_aggregates(archive, kind, spec):
+    engine = engines.open_engine(archive, kind)
+
+    for column in ("year", "runtime", "imdb_score", "votes"):
+        expected = engine.aggregate(column, "min", spec), engine.aggregate(column, "max", spec)
+        if not engine.count(spec):
+            expected = None, None
+        assert engine.bounds(column, spec) == pytest.approx(expected)
+
+
+def test_slider_bounds_open_no_partition(archive):
+    engine = engines.open_engine(archive, "partitioned")
+
+    years, runtimes = engine.bounds("year"), engine.bounds("runtime")
+
+    assert engine.tables == {}
+    assert years == (engine.aggregate("year", "min"), engine.aggregate("year", "max"))
+    assert runtimes == (engine.aggregate("runtime", "min"), engine.aggregate("runtime", "max"))
@@ -0,0 +1,54 @@
+"""FigureCache drawing, caching and closing matplotlib figures."""
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from figures import FigureCache  # noqa: E402
+
+
+def draw_bars(values):
+    fig, ax = plt.subplots()
+    ax.bar(range(len(values)), values)
+    return fig
+
+
+def test_a_figure_is_drawn_once_per_data_and_closed():
+    cache = FigureCache()
+    values = pd.Series([3, 1, 2])
+
+    first = cache.get("bars", draw_bars, values)
+    again = cache.get("bars", draw_bars, values.copy())
+
+    assert first.startswith(b"\x89PNG") and again is first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert plt.get_fignums() == []
+
+
+def test_figures_of_a_failing_draw_are_closed():
+    cache = FigureCache()
+    kept = plt.figure()  # opened by someone else: left alone
+
+    def broken(values):
+        plt.subplots()
+        raise ValueError("no data")
+
+    try:
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                cache.get("broken", broken, pd.Series([1]))
+        assert plt.get_fignums() == [kept.number]
+        assert cache.stats()["size"] == 0
+    finally:
+        plt.close(kept)
+
+
+def test_nothing_to_draw_is_cached_as_none():
+    cache = FigureCache()
+
+    assert cache.get("empty", lambda: None, key="v1") is None
+    assert cache.get("empty", lambda: None, key="v1") is None
+    assert cache.stats()["hits"] == 1
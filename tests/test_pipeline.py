@@ -0,0 +1,55 @@
+"""pipeline.run on the raw genre lists in the repository."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import pipeline
+from conftest import ROOT
+
+RAW = ["Fantasy_IMDb2024_list.csv", "Family_IMDb2024_list.csv"]
+
+
+@pytest.fixture
+def raw_lists(tmp_path):
+    paths = [str(tmp_path / name) for name in RAW]
+    for name, path in zip(RAW, paths):
+        shutil.copy(os.path.join(ROOT, name), path)
+    return paths
+
+
+def run(paths, directory, **options):
+    out, movies_out = str(directory / "merged.csv"), str(directory / "movies.csv")
+    pipeline.run(paths, out, workers=1, movies_out=movies_out, report=lambda line: None, **options)
+    return out, movies_out
+
+
+def test_the_merged_csv_keeps_its_columns_and_the_movie_table_gets_the_year(raw_lists, tmp_path):
+    out, movies_out = run(raw_lists, tmp_path)
+
+    assert list(pd.read_csv(out, nrows=0).columns) == pipeline.COLUMNS
+    movies = pd.read_csv(movies_out)
+    assert set(movies["year"]) == {2024}
+    assert {"Fantasy", "Family"} <= set(movies.columns)
+
+
+def test_outputs_with_more_genres_are_not_replaced(raw_lists, tmp_path):
+    out, movies_out = run(raw_lists, tmp_path)
+    before = open(out, "rb").read(), open(movies_out, "rb").read()
+
+    with pytest.raises(FileExistsError, match="Fantasy"):
+        run(raw_lists[1:], tmp_path)
+    assert (open(out, "rb").read(), open(movies_out, "rb").read()) == before
+
+    run(raw_lists[1:], tmp_path, force=True)
+    assert set(pd.read_csv(out)["genre"]) == {"Family"}
+
+
+def test_main_refuses_without_force(raw_lists, tmp_path, capsys):
+    run(raw_lists, tmp_path)
+
+    with pytest.raises(SystemExit):
+        pipeline.main(["--raw", raw_lists[1], "--out", str(tmp_path / "merged.csv"),
+                       "--movies-out", str(tmp_path / "movies.csv"), "--workers", "1"])
+    assert "--force" in capsys.readouterr().err
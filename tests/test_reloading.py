@@ -0,0 +1,95 @@
+"""DatasetWatcher following rows appended to a copy of movies.csv."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import dataset
+import query
+from conftest import ROOT
+from reloading import DatasetWatcher
+
+
+@pytest.fixture
+def movies_csv(tmp_path):
+    path = str(tmp_path / "movies.csv")
+    shutil.copy(os.path.join(ROOT, "movies.csv"), path)
+    # the compact columnar copy, as the pipeline leaves it: runtime and votes are unsigned integers
+    dataset.write_columnar(pd.read_csv(path), dataset.columnar_path(path))
+    return path
+
+
+def append_movie(path, **values):
+    with open(path, newline="") as f:
+        header = f.readline().strip().split(",")
+    row = {column: "False" for column in header}
+    row.update({"year": "2024", "genre": "Family"}, **values)
+    with open(path, "a", newline="") as f:
+        f.write(",".join(row[column] for column in header) + "\r\n")
+
+
+def test_rows_with_a_blank_runtime_are_appended(movies_csv):
+    watcher = DatasetWatcher(movies_csv, "pandas")
+    assert watcher.engine.movies["runtime"].dtype == "uint16"
+
+    append_movie(movies_csv, title="No Runtime Yet", runtime="", imdb_score="7.1", votes="")
+    engine = watcher.current()
+
+    assert watcher.stats()["appends"] == 1
+    assert engine.movies.iloc[-1][["title", "runtime", "votes"]].tolist() == ["No Runtime Yet", 0, 0]
+    assert engine.version == dataset.frames_version([pd.read_csv(movies_csv)])
+
+    append_movie(movies_csv, title="After It", runtime="95", imdb_score="6.4", votes="120")
+    assert len(watcher.current().movies) == len(engine.movies) + 1
+    assert watcher.stats()["appends"] == 2
+
+
+def test_rows_that_cannot_be_appended_are_read_again(movies_csv, monkeypatch):
+    watcher = DatasetWatcher(movies_csv, "pandas")
+
+    def cannot_extend(self, rows, version=None):
+        raise ValueError("cannot cast")
+
+    monkeypatch.setattr(query.MovieQuery, "extended", cannot_extend)
+    append_movie(movies_csv, title="Read Again", runtime="90", imdb_score="7.0", votes="10")
+    engine = watcher.current()
+
+    assert watcher.stats()["reloads"] == 1
+    assert engine.movies["title"].iloc[-1] == "Read Again"
+    assert engine.version == dataset.frames_version([pd.read_csv(movies_csv)])
+    # and the appends after it are followed again
+    monkeypatch.undo()
+    append_movie(movies_csv, title="Appended", runtime="80", imdb_score="6.0", votes="5")
+    assert watcher.current().movies["title"].iloc[-1] == "Appended"
+    assert watcher.stats()["appends"] == 1
+
+
+def test_an_engine_on_the_replaced_partitions_keeps_answering(movies_csv):
+    import partitions
+    from query import FilterSpec
+
+    directory = partitions.partitions_path(movies_csv)
+    movies = pd.read_csv(movies_csv)
+    partitions.write_partitions(movies, directory)
+    watcher = DatasetWatcher(movies_csv, "partitioned")
+    old = watcher.current()
+    spec = FilterSpec.make(genres=["Fantasy"], min_score=1.0)
+    expected = old.count(spec), old.frame(spec)
+    old.tables.clear()  # nothing opened yet, as in a fresh session
+
+    partitions.write_partitions(movies.assign(votes=movies["votes"] + 1), directory)
+    new = watcher.current()
+
+    assert new.version != old.version and watcher.stats()["reloads"] == 1
+    # the old engine still reads its own files, with its own offsets
+    assert old.count(spec) == expected[0]
+    pd.testing.assert_frame_equal(old.frame(spec), expected[1])
+    assert (new.frame(spec)["votes"].to_numpy() == expected[1]["votes"].to_numpy() + 1).all()
+
+    # two versions on, the first one's files are gone
+    partitions.write_partitions(movies.assign(votes=movies["votes"] + 2), directory)
+    assert sorted(name for name in os.listdir(directory) if name != partitions.MANIFEST) == sorted([
+        os.path.dirname(os.path.dirname(new.manifest.partitions[0]["path"])),
+        os.path.dirname(os.path.dirname(watcher.current().manifest.partitions[0]["path"])),
+    ])
@@ -0,0 +1,94 @@
+"""Running statistics merged over splits of the rows against pandas on all of them."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+from conftest import ROOT
+from query import FilterSpec, MovieQuery
+from running_stats import Comoment, MovieStats, RunningStats
+
+
+@pytest.fixture(scope="module")
+def values():
+    rng = np.random.default_rng(7)
+    scores = rng.normal(6.5, 1.2, 5000)
+    scores[rng.random(5000) < 0.05] = np.nan
+    return pd.DataFrame({"imdb_score": scores, "votes": rng.integers(0, 2_000_000, 5000, dtype=np.uint32)})
+
+
+def splits(length, parts, seed):
+    cuts = np.sort(np.random.default_rng(seed).integers(0, length, parts - 1))
+    return np.split(np.arange(length), cuts)  # some parts may be empty
+
+
+def assert_like_pandas(stats, column):
+    present = column.dropna()
+    assert stats.count == len(present)
+    assert stats.total == pytest.approx(present.sum(), rel=1e-12)
+    assert stats.mean == pytest.approx(present.mean(), rel=1e-12)
+    assert stats.variance == pytest.approx(present.var(), rel=1e-9)
+    assert (stats.min, stats.max) == (present.min(), present.max())
+
+
+@pytest.mark.parametrize("name", ["imdb_score", "votes"])
+@pytest.mark.parametrize("seed", range(3))
+def test_merged_splits_give_the_statistics_of_all_rows(values, name, seed):
+    column = values[name]
+    merged = RunningStats()
+    for part in splits(len(column), 12, seed):
+        merged = merged.merge(RunningStats.of(column.to_numpy()[part]))
+
+    assert_like_pandas(merged, column)
+    assert_like_pandas(RunningStats.of(column.to_numpy()), column)
+
+
+def test_pushing_one_value_at_a_time(values):
+    column = values["imdb_score"]
+    stats = RunningStats()
+    for value in column.tolist()[:500]:
+        stats.push(value)
+
+    assert_like_pandas(stats, column.iloc[:500])
+
+
+def test_integer_totals_are_exact():
+    votes = np.full(1000, 4_000_000_000, dtype=np.uint32)
+
+    assert RunningStats.of(votes).total == 4_000_000_000_000
+
+
+def test_no_values():
+    stats = RunningStats.of(np.array([np.nan, np.nan]))
+
+    assert stats.count == 0 and stats.min is None and np.isnan(stats.variance)
+    assert RunningStats().merge(stats) == RunningStats()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_merged_comoments_give_the_correlation(values, seed):
+    x, y = values["imdb_score"].to_numpy(), values["votes"].to_numpy()
+    merged = Comoment()
+    for part in splits(len(x), 12, seed):
+        merged = merged.merge(Comoment.of(x[part], y[part]))
+
+    assert merged.correlation == pytest.approx(values["imdb_score"].corr(values["votes"]), rel=1e-9)
+    assert merged.covariance == pytest.approx(values["imdb_score"].cov(values["votes"]), rel=1e-9)
+
+
+def test_summary_from_cells_matches_a_scan():
+    movies = pd.read_csv(os.path.join(ROOT, "movies.csv")).sample(3000, replace=True, random_state=3)
+    movies["year"] = 2020 + np.arange(len(movies)) % 4
+    engine = MovieQuery(dataset.freeze(dataset.compact(movies)))
+
+    for spec in [FilterSpec(), FilterSpec.make(genres=["Family"]), FilterSpec.make(genres=["Fantasy", "Family"], genre_mode="all"),
+                 FilterSpec.make(year=(2021, 2022)), FilterSpec.make(min_score=7.0)]:
+        summary = engine.summary(spec)
+        frame = engine.frame(spec, ["imdb_score", "votes", "runtime"])
+        assert summary.rows == len(frame)
+        for column in ("imdb_score", "votes", "runtime"):
+            assert_like_pandas(summary[column], frame[column].astype(np.float64))
+        assert summary.correlation == pytest.approx(frame["imdb_score"].corr(frame["votes"].astype(np.float64)))
+        assert MovieStats.from_dict(summary.to_dict()) == summary
@@ -0,0 +1,157 @@
+"""The multi-genre scheduler of scrape.py against saved search pages served over http.server.
+
+SavedPageDriver stands in for Chrome: it loads a page from the local
+server and answers the scripts the scraper runs from its markup, so the
+scheduler, the "more" controller and the CSV writing run as they do in a
+browser. `test_scrape_in_chrome` does the same through a real headless
+Chrome and is skipped where none can be started.
+"""
+import html
+import os
+import re
+import threading
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+import pagination
+import scrape
+from conftest import ROOT
+
+COLUMNS = ["Title", "Runtime", "IMDB_Score", "Votes"]
+RUNTIME = re.compile(r"^(\d+h)?\s*(\d+m)?$")
+
+
+def _text(markup, css_class):
+    match = re.search(rf'class="[^"]*\b{css_class}\b[^"]*">(.*?)</', markup, re.S)
+    return html.unescape(match.group(1)).strip() if match else None
+
+
+class SavedPageDriver:
+    def __init__(self):
+        self.page = ""
+        self.closed = False
+
+    def get(self, url):
+        with urlopen(url) as response:
+            self.page = response.read().decode("utf-8")
+
+    def _items(self):
+        # what scrape.EXTRACT_JS reads from every result `li`
+        items = []
+        for li in re.findall(r'<li class="ipc-metadata-list-summary-item">(.*?)</li>', self.page, re.S):
+            title_id = re.search(r'href="/title/(tt\d+)', li)
+            metadata = [html.unescape(text).strip() for text in re.findall(r'dli-title-metadata-item">(.*?)</', li)]
+            items.append({
+                "title_id": title_id.group(1) if title_id else None,
+                "title": _text(li, "ipc-title__text"),
+                "runtime": next((text for text in metadata if text and RUNTIME.match(text)), None),
+                "rating": _text(li, "ipc-rating-star--rating"),
+                "votes": _text(li, "ipc-rating-star--voteCount"),
+            })
+        return items
+
+    def execute_script(self, script, *args):
+        if script == scrape.EXTRACT_JS:
+            return self._items()
+        if script == pagination.COUNT_JS:
+            return len(self._items())
+        if script == pagination.TOTAL_JS:
+            total = re.search(r"\d[\d,]*\s*-\s*\d[\d,]*\s+of\s+(\d[\d,]*)", self.page)
+            return int(total.group(1).replace(",", "")) if total else None
+        if script == pagination.CLICK_MORE_JS:
+            return False  # the saved pages hold every result
+        return None  # navigation timing
+
+    def get_log(self, kind):
+        return []
+
+    def quit(self):
+        self.closed = True
+
+
+class DriverFactory:
+    def __init__(self):
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        driver = SavedPageDriver()
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+
+def saved_list(name, rows):
+    """The first `rows` rows of a genre list scraped from IMDb before, as strings."""
+    return pd.read_csv(os.path.join(ROOT, name), dtype=str, keep_default_na=False).head(rows)
+
+
+def read_csv(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_scrape_genres_writes_one_csv_per_job(imdb_server, tmp_path):
+    jobs = [scrape.ScrapeJob("family", output=str(tmp_path / "family.csv")),
+            scrape.ScrapeJob("fantasy", output=str(tmp_path / "fantasy.csv"))]
+    factory = DriverFactory()
+
+    results = scrape.scrape_genres(jobs, max_workers=2, base_url=imdb_server.url, driver_factory=factory)
+
+    assert [result.job for result in results] == jobs
+    assert all(result.ok for result in results), [result.error for result in results]
+    assert [result.rows for result in results] == [12, 8]
+    family = read_csv(tmp_path / "family.csv")
+    assert list(family.columns) == COLUMNS
+    pd.testing.assert_frame_equal(family, saved_list("Family_IMDb2024_list.csv", 12))
+    pd.testing.assert_frame_equal(read_csv(tmp_path / "fantasy.csv"), saved_list("Fantasy_IMDb2024_list.csv", 8))
+    assert sorted(imdb_server.requests) == ["family", "fantasy"]
+
+
+def test_workers_keep_one_browser_for_all_their_jobs(imdb_server, tmp_path):
+    jobs = [scrape.ScrapeJob(genre, output=str(tmp_path / f"{genre}{i}.csv"))
+            for i in range(3) for genre in ("family", "fantasy")]
+    factory = DriverFactory()
+
+    results = scrape.scrape_genres(jobs, max_workers=2, base_url=imdb_server.url, driver_factory=factory)
+
+    assert all(result.ok for result in results)
+    assert len(factory.drivers) == 2
+    assert all(driver.closed for driver in factory.drivers)
+
+
+def test_a_failing_job_does_not_stop_the_others(imdb_server, tmp_path):
+    # no saved page for this genre: the server answers 404
+    jobs = [scrape.ScrapeJob("western", output=str(tmp_path / "western.csv")),
+            scrape.ScrapeJob("family", output=str(tmp_path / "family.csv"))]
+
+    results = scrape.scrape_genres(jobs, max_workers=1, base_url=imdb_server.url, driver_factory=DriverFactory())
+
+    assert not results[0].ok and "404" in results[0].error
+    assert results[1].ok and results[1].rows == 12
+    assert not (tmp_path / "western.csv").exists()
+
+
+def test_browser_start_failure_is_reported_per_job(imdb_server, tmp_path):
+    def broken():
+        raise RuntimeError("no chrome")
+
+    jobs = [scrape.ScrapeJob("family", output=str(tmp_path / "family.csv"))]
+    results = scrape.scrape_genres(jobs, base_url=imdb_server.url, driver_factory=broken)
+
+    assert results[0].error == "browser start failed: no chrome"
+
+
+def test_scrape_in_chrome(imdb_server, tmp_path):
+    try:
+        driver = scrape.make_driver()
+    except Exception as exc:
+        pytest.skip(f"cannot start Chrome: {exc}")
+    driver.quit()
+    jobs = [scrape.ScrapeJob("family", output=str(tmp_path / "family.csv"))]
+
+    results = scrape.scrape_genres(jobs, base_url=imdb_server.url, timeout=5)
+
+    assert results[0].ok, results[0].error
+    pd.testing.assert_frame_equal(read_csv(tmp_path / "family.csv"), saved_list("Family_IMDb2024_list.csv", 12))
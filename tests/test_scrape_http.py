@@ -0,0 +1,81 @@
+"""The browserless backend of scrape_http.py against saved `__NEXT_DATA__` pages served over http.server."""
+import pandas as pd
+import pytest
+
+import scrape
+from checkpoint import CheckpointStore
+from test_scrape import COLUMNS, read_csv, saved_list
+
+pytest.importorskip("aiohttp")
+
+import scrape_http  # noqa: E402
+
+
+def numbered(rows):
+    """The saved list numbered by position: a title the live list dropped leaves a gap in it."""
+    rows = rows.copy()
+    names = rows["Title"].str.replace(r"^\d+\.\s*", "", regex=True)
+    rows["Title"] = [f"{position}. {name}" for position, name in enumerate(names, 1)]
+    return rows
+
+
+def test_pages_are_fetched_by_offset_and_written_as_one_csv(imdb_server, tmp_path):
+    job = scrape.ScrapeJob("family", output=str(tmp_path / "family.csv"))
+
+    [result] = scrape_http.scrape_genres([job], base_url=imdb_server.url)
+
+    assert result.ok, result.error
+    assert result.rows == 60
+    assert imdb_server.requests == [("family", 1), ("family", 51)]
+    family = read_csv(tmp_path / "family.csv")
+    assert list(family.columns) == COLUMNS
+    # the same rows, in the same text, as the Selenium backend scraped them
+    pd.testing.assert_frame_equal(family, numbered(saved_list("Family_IMDb2024_list.csv", 60)))
+
+
+def test_short_pages_are_stepped_by_the_size_served(imdb_server, tmp_path):
+    # these pages hold 20 results each although 50 are asked for
+    job = scrape.ScrapeJob("fantasy", output=str(tmp_path / "fantasy.csv"))
+
+    [result] = scrape_http.scrape_genres([job], base_url=imdb_server.url)
+
+    assert result.ok, result.error
+    assert sorted(imdb_server.requests) == [("fantasy", 1), ("fantasy", 21), ("fantasy", 41)]
+    pd.testing.assert_frame_equal(read_csv(tmp_path / "fantasy.csv"), saved_list("Fantasy_IMDb2024_list.csv", 45))
+
+
+def test_max_results_caps_the_pages_fetched(imdb_server, tmp_path):
+    job = scrape.ScrapeJob("fantasy", output=str(tmp_path / "fantasy.csv"))
+
+    [result] = scrape_http.scrape_genres([job], base_url=imdb_server.url, max_results=30)
+
+    assert result.rows == 30
+    assert sorted(imdb_server.requests) == [("fantasy", 1), ("fantasy", 21)]
+
+
+def test_an_interrupted_run_resumes_from_the_checkpoint(imdb_server, tmp_path):
+    job = scrape.ScrapeJob("fantasy", output=str(tmp_path / "fantasy.csv"))
+    checkpoint = CheckpointStore(str(tmp_path / "checkpoint.sqlite"))
+    try:
+        imdb_server.fail.add(("fantasy", 41))
+        [failed] = scrape_http.scrape_genres([job], base_url=imdb_server.url, checkpoint=checkpoint)
+        assert not failed.ok and "500" in failed.error
+        assert not (tmp_path / "fantasy.csv").exists()
+        assert checkpoint.completed_pages(job) == {1, 21}
+
+        imdb_server.fail.clear()
+        imdb_server.requests.clear()
+        [resumed] = scrape_http.scrape_genres([job], base_url=imdb_server.url, checkpoint=checkpoint)
+
+        assert resumed.ok, resumed.error
+        # the first page is read again for the total; the saved second page is not
+        assert sorted(imdb_server.requests) == [("fantasy", 1), ("fantasy", 41)]
+        assert resumed.rows == 45
+        pd.testing.assert_frame_equal(read_csv(tmp_path / "fantasy.csv"), saved_list("Fantasy_IMDb2024_list.csv", 45))
+        assert checkpoint.completed_pages(job) == set()
+
+        # a later run only merges rows that changed: nothing here
+        [again] = scrape_http.scrape_genres([job], base_url=imdb_server.url, checkpoint=checkpoint)
+        assert again.ok and again.rows == 0
+    finally:
+        checkpoint.close()
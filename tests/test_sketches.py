@@ -0,0 +1,102 @@
+"""The sketches against exact answers on seeded data, within the bounds they report."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import FixedHistogram, HyperLogLog, KLLSketch, MovieSketch
+
+Q = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(sketch, values):
+    """Largest distance of a sketch quantile from the ranks its answer holds in the sorted values."""
+    values = np.sort(values)
+    answers = [sketch.quantile(q) for q in Q]
+    low, high = (np.searchsorted(values, answers, side=side) / len(values) for side in ("left", "right"))
+    return np.maximum(np.maximum(low - Q, Q - high), 0).max()
+
+
+def merged(make, chunks):
+    first, *rest = [make(chunk) for chunk in chunks]
+    return first.merge(*rest)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_kll_quantiles_stay_within_the_rank_error(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(8, 2, 200_000).round()
+
+    one = KLLSketch.of(values)
+    # as a selection is answered: a sketch per cell, merged
+    cells = merged(KLLSketch.of, np.array_split(values, 37))
+
+    for sketch in (one, cells):
+        assert not sketch.exact and sketch.count == len(values)
+        assert rank_error(sketch, values) <= sketch.rank_error
+        assert (sketch.min, sketch.max) == (values.min(), values.max())
+        assert sum(map(len, sketch.levels)) < 2_000
+
+
+def test_kll_histogram_stays_within_the_bin_error():
+    values = np.random.default_rng(4).normal(6.5, 1.2, 100_000)
+    sketch = merged(KLLSketch.of, np.array_split(values, 10))
+
+    histogram = sketch.histogram(20)
+    exact = np.histogram(values, bins=np.linspace(values.min(), values.max(), 21))[0]
+
+    assert histogram["count"].sum() == len(values)
+    assert np.abs(histogram["count"].to_numpy() - exact).max() <= sketch.bin_error * len(values)
+
+
+def test_kll_of_few_values_is_exact():
+    values = np.array([3.0, np.nan, 1.0, 2.0, 5.0])
+    sketch = KLLSketch.of(values)
+
+    assert sketch.exact and sketch.rank_error == 0.0
+    assert [sketch.quantile(q) for q in (0, 0.5, 1)] == [1.0, 2.0, 5.0]
+    assert sketch.rank(2.0) == 0.5
+    assert np.isnan(KLLSketch.of([np.nan]).quantile(0.5))
+
+
+def test_kll_does_not_depend_on_the_row_order():
+    values = np.random.default_rng(5).integers(0, 1000, 50_000).astype(float)
+
+    shuffled = np.random.default_rng(6).permutation(values)
+
+    assert KLLSketch.of(values).to_dict() == KLLSketch.of(shuffled).to_dict()
+
+
+@pytest.mark.parametrize("distinct", [50, 5_000, 200_000])
+def test_hyperloglog_estimate_within_three_standard_errors(distinct):
+    rng = np.random.default_rng(distinct)
+    titles = pd.Series([f"title {i}" for i in range(distinct)])
+    values = titles[rng.integers(0, distinct, 2 * distinct)]
+    values = pd.concat([values, titles])  # every title at least once
+
+    sketch = merged(HyperLogLog.of, np.array_split(values.to_numpy(), 8))
+
+    assert abs(sketch.estimate() / distinct - 1) <= 3 * sketch.relative_error
+    assert sketch.estimate() == HyperLogLog.of(values).estimate()
+
+
+def test_fixed_histogram_counts_exactly():
+    scores = np.random.default_rng(8).uniform(0, 10, 10_000).round(1)
+    scores[:10] = np.nan
+
+    histogram = merged(FixedHistogram.of, np.array_split(scores, 7))
+
+    assert histogram.counts.tolist() == np.histogram(scores[10:], bins=np.linspace(0, 10, 21))[0].tolist()
+    with pytest.raises(ValueError):
+        histogram.merge(FixedHistogram((0, 5, 10)))
+
+
+def test_movie_sketch_round_trips_through_json():
+    rng = np.random.default_rng(9)
+    frame = pd.DataFrame({"title": [f"t{i % 700}" for i in range(3000)], "imdb_score": rng.uniform(1, 10, 3000),
+                          "votes": rng.integers(0, 10**6, 3000)})
+
+    sketch = MovieSketch.of(frame)
+    again = MovieSketch.from_dict(sketch.to_dict())
+
+    assert again.to_dict() == sketch.to_dict()
+    assert again.rows == 3000 and again.quantiles["votes"].quantile(0.5) == sketch.quantiles["votes"].quantile(0.5)
@@ -0,0 +1,67 @@
+"""tidb_extract against a SQLite copy of the genre tables, built from the raw lists in the repository."""
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import tidb_extract
+from cleaning import clean_frame
+from conftest import ROOT
+
+GENRES = ["Fantasy", "Family"]
+
+
+def raw_list(genre):
+    return pd.read_csv(os.path.join(ROOT, f"{genre}_IMDb2024_list.csv"), dtype=str, keep_default_na=False)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """The genre tables with the lowercase columns of the TiDB ones."""
+    path = str(tmp_path / "movies.db")
+    with sqlite3.connect(path) as connection:
+        for genre in GENRES:
+            raw_list(genre).rename(columns=str.lower).to_sql(genre, connection, index=False)
+    return path
+
+
+def expected():
+    return pd.concat([clean_frame(raw_list(genre), genre) for genre in GENRES], ignore_index=True)
+
+
+@pytest.mark.parametrize("union", [True, False], ids=["union all", "per genre"])
+@pytest.mark.parametrize("batch_size", [7, tidb_extract.BATCH_SIZE])
+def test_extracted_genres_match_the_cleaned_lists(database, union, batch_size):
+    connection = tidb_extract.connect_sqlite(database)
+    try:
+        df = tidb_extract.extract_genres(connection, GENRES, union=union, batch_size=batch_size)
+    finally:
+        connection.close()
+
+    pd.testing.assert_frame_equal(df, expected())
+
+
+def test_no_genres_give_an_empty_frame(database):
+    connection = tidb_extract.connect_sqlite(database)
+    try:
+        df = tidb_extract.extract_genres(connection, [], union=False)
+    finally:
+        connection.close()
+
+    assert df.empty and list(df.columns) == tidb_extract.COLUMNS
+
+
+def test_table_names_are_checked():
+    with pytest.raises(ValueError):
+        tidb_extract.genre_query(["Family`; drop table Family; --"])
+
+
+def test_main_writes_the_rows_sorted_by_title(database, tmp_path):
+    out = str(tmp_path / "merged.csv")
+
+    tidb_extract.main(["--sqlite", database, "--out", out, *(f"--genre={genre}" for genre in GENRES)])
+
+    df = pd.read_csv(out)
+    assert len(df) == len(expected())
+    assert df["title"].tolist() == sorted(expected()["title"])
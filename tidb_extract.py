@@ -0,0 +1,113 @@
+"""Stream the genre tables out of TiDB and clean them on the way.
+
+One pooled connection is opened for the whole run (instead of a fresh
+`mysql.connector.connect` per genre) and rows are read with unbuffered
+cursors in `fetchmany` batches, each batch going straight through
+`cleaning.clean_frame`. With `union=True` all genres come back from a single
+`UNION ALL` query tagged with the genre name.
+
+Credentials come from the environment:
+
+    TIDB_HOST, TIDB_PORT (4000), TIDB_USER, TIDB_PASSWORD, TIDB_DATABASE (IMDb_movies)
+
+Any DB-API connection with `cursor()` / `fetchmany()` works, so a local
+SQLite copy of the tables can stand in for TiDB (`--sqlite movies.db`).
+
+    python tidb_extract.py --out merged_movies_sorted.csv
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+from cleaning import COLUMNS, clean_frame
+
+GENRES = ['Fantasy', 'Animation', 'Adventure', 'Family']
+BATCH_SIZE = 10_000
+
+_pool = None
+
+
+def connect():
+    """Return a connection from the process-wide TiDB pool (created on first use)."""
+    global _pool
+    if _pool is None:
+        from mysql.connector import pooling
+
+        _pool = pooling.MySQLConnectionPool(
+            pool_name="imdb",
+            pool_size=1,
+            host=os.environ["TIDB_HOST"],
+            port=int(os.environ.get("TIDB_PORT", 4000)),
+            user=os.environ["TIDB_USER"],
+            password=os.environ["TIDB_PASSWORD"],
+            database=os.environ.get("TIDB_DATABASE", "IMDb_movies"),
+        )
+    return _pool.get_connection()
+
+
+def connect_sqlite(path):
+    return sqlite3.connect(path)
+
+
+def _table(genre):
+    if not re.fullmatch(r'\w+', genre):
+        raise ValueError(f"invalid genre table name: {genre!r}")
+    return f"`{genre}`"
+
+
+def genre_query(genres, union=True):
+    """One `select` per genre table, or all of them joined with UNION ALL."""
+    selects = [f"select *, '{genre}' as genre from {_table(genre)}" for genre in genres]
+    return [" union all ".join(selects)] if union else selects
+
+
+def iter_batches(connection, query, batch_size=BATCH_SIZE):
+    """Yield the result of `query` as DataFrames of at most `batch_size` rows."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        while rows := cursor.fetchmany(batch_size):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+
+def iter_clean_batches(connection, genres=GENRES, union=True, batch_size=BATCH_SIZE):
+    for query in genre_query(genres, union):
+        for batch in iter_batches(connection, query, batch_size):
+            yield clean_frame(batch)
+
+
+def extract_genres(connection, genres=GENRES, union=True, batch_size=BATCH_SIZE):
+    """All genres as one cleaned DataFrame (title, runtime, imdb_score, votes, genre)."""
+    batches = list(iter_clean_batches(connection, genres, union, batch_size))
+    if not batches:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(batches, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract and clean the genre tables from TiDB.")
+    parser.add_argument("--genre", action="append", help="genre table (repeatable, default: all four)")
+    parser.add_argument("--out", default="merged_movies_sorted.csv")
+    parser.add_argument("--per-genre", action="store_true", help="one query per genre instead of UNION ALL")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--sqlite", help="read from a local SQLite file instead of TiDB")
+    args = parser.parse_args(argv)
+
+    connection = connect_sqlite(args.sqlite) if args.sqlite else connect()
+    try:
+        df = extract_genres(connection, args.genre or GENRES, union=not args.per_genre, batch_size=args.batch_size)
+    finally:
+        connection.close()
+
+    df.sort_values('title').to_csv(args.out, index=False)
+    print(f"{len(df):,} rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Per-title word counts for the title wordcloud.
+
+The titles are tokenized once when the data loads, the way
+`WordCloud.process_text` does it (drop "'s", numbers and stopwords, fold
+case, merge plurals - across the whole dataset rather than per selection),
+and kept as one (row, word id) pair per word. The
+wordcloud of a filtered selection is then a `bincount` over the pairs of
+the selected rows, passed to `generate_from_frequencies`, instead of
+joining and re-tokenizing every title on each rerun. Collocations (two-word
+phrases) are not detected.
+"""
+import numpy as np
+import pandas as pd
+from wordcloud import STOPWORDS, WordCloud
+
+TOKEN = r"\w[\w']*"
+
+# caps that keep large selections inside the page's latency budget
+MAX_WORDS = 100
+WIDTH, HEIGHT = 800, 400
+
+
+class TitleWords:
+    def __init__(self, titles, stopwords=STOPWORDS):
+        words = pd.Series(np.asarray(titles, dtype=object)).str.findall(TOKEN).explode().dropna()
+        words = words.astype(str)
+        words = words.where(~words.str.lower().str.endswith("'s"), words.str[:-2])
+        lower = words.str.lower()
+        keep = ~words.str.isdigit() & ~lower.isin({word.lower() for word in stopwords}) & (lower != "")
+        words, lower = words[keep], lower[keep]
+
+        codes, vocabulary = pd.factorize(lower)
+        # show each word in its most common spelling, e.g. "Moana" rather than "moana"
+        spellings = pd.DataFrame({"code": codes, "word": words.to_numpy()}).value_counts()
+        labels = spellings.reset_index().drop_duplicates("code").set_index("code")["word"]
+
+        # "cars" counts as "car" when both appear
+        singular = {word: i for i, word in enumerate(vocabulary)}
+        merge = np.arange(len(vocabulary))
+        for i, word in enumerate(vocabulary):
+            if word.endswith("s") and not word.endswith("ss") and word[:-1] in singular:
+                merge[i] = singular[word[:-1]]
+        codes = merge[codes]
+
+        self.size = len(titles)
+        self.rows = words.index.to_numpy()
+        self.codes = codes
+        self.labels = labels.reindex(range(len(vocabulary))).to_numpy()
+
+    def counts(self, rows=None):
+        """Word counts over the titles at positions `rows` (all titles when None)."""
+        codes = self.codes
+        if rows is not None and len(rows) < self.size:
+            selected = np.zeros(self.size, dtype=bool)
+            selected[rows] = True
+            codes = codes[selected[self.rows]]
+        return np.bincount(codes, minlength=len(self.labels))
+
+    def frequencies(self, rows=None, max_words=MAX_WORDS):
+        """{word: count} of the `max_words` most frequent words of the selected titles."""
+        counts = self.counts(rows)
+        top = np.flatnonzero(counts)
+        if len(top) > max_words:
+            top = top[np.argpartition(counts[top], -max_words)[-max_words:]]
+        return {self.labels[i]: int(counts[i]) for i in top}
+
+    def wordcloud(self, rows=None, max_words=MAX_WORDS, width=WIDTH, height=HEIGHT, **options):
+        """A laid-out WordCloud of the selected titles, or None when they have no words."""
+        frequencies = self.frequencies(rows, max_words)
+        if not frequencies:
+            return None
+        options.setdefault("background_color", "white")
+        cloud = WordCloud(width=width, height=height, max_words=max_words, **options)
+        return cloud.generate_from_frequencies(frequencies)